@@ -1,11 +1,31 @@
 from abc import ABC, abstractmethod
+import asyncio
 import logging
-from typing import Generic, TypeVar
+import time
+from typing import Any, Generic, Sequence, TypeVar
+from uuid import uuid4
 
+from faststream import Context
 from faststream.broker.core.usecase import BrokerUsecase
+from faststream.broker.message import StreamMessage
+from faststream.broker.subscriber.usecase import SubscriberUsecase
+from faststream.exceptions import AckMessage
 
-from nfa.broker import Broker
+from nfa.broker import Broker, Subscriber, Message
+from nfa.broker.capture import CaptureRecord
+from nfa.broker.enums import CaptureDirection, ValidationMode
+from nfa.broker.ratelimit import PublishLimiter
+from nfa.broker.retry import (
+    ATTEMPT_HEADER,
+    ERROR_MESSAGE_HEADER,
+    ERROR_TYPE_HEADER,
+    FAILED_AT_HEADER,
+    ORIGIN_HEADER,
+    RETRY_AT_HEADER,
+    RetryPolicy,
+)
 from nfa.broker.settings import BaseBrokerSettings
+from nfa.broker.validation import VALIDATION_HEADER, build_message, resolve_validation_mode
 
 
 logger = logging.getLogger(__name__)
@@ -19,13 +39,243 @@ class FaststreamBroker(Broker[SettingsType], ABC, Generic[SettingsType]):
     
     This class handles common FastStream broker operations and state management.
     """
+    # Publish errors signalling the broker is throttling the publisher
+    _throttle_errors: tuple[type[Exception], ...] = (TimeoutError,)
+
+    def __init__(self, settings: SettingsType):
+        """Initialize the broker with settings"""
+        super().__init__(settings)
+        self._limiter = PublishLimiter(settings.rate_limit) if settings.rate_limit else None
+        self._is_consuming = False
+        self._is_warm = False
+
+        # Request/reply state: one reply destination per broker and the pending requests by correlation id
+        self._reply_to: str | None = None
+        self._reply_lock = asyncio.Lock()
+        self._pending_replies: dict[str, asyncio.Future] = {}
+
     @abstractmethod
     def _create_broker(self) -> BrokerUsecase:
         """Create and configure the FastStream broker instance"""
         pass
 
-    async def open(self) -> None:
-        """Open the broker connection"""
+    @abstractmethod
+    async def _publish(self, message: Message, routing_key: str, **options: Any) -> None:
+        """
+        Publish a message to the broker once allowed by the rate limits
+
+        Args:
+            message: The message to publish
+            routing_key: The routing key of the message
+            **options: Extra FastStream publish options, e.g. reply_to and correlation_id
+        """
+        pass
+
+    @abstractmethod
+    async def _warmup(self, message_types: Sequence[type[Message]]) -> None:
+        """Prepare the topology and connections used by the given message types"""
+        pass
+
+    @abstractmethod
+    def _create_reply_subscriber(self) -> tuple[SubscriberUsecase, str]:
+        """Create the subscriber of the reply destination of this broker and return it with the destination name"""
+        pass
+
+    async def _ready_reply_subscriber(self, subscriber: SubscriberUsecase) -> None:
+        """Wait until the started reply subscriber receives every reply sent from now on"""
+        pass
+
+    @abstractmethod
+    async def _publish_retry(self, routing_key: str, attempt: int, message: StreamMessage[Any], headers: dict[str, str]) -> None:
+        """Publish a failed message to the delay destination of its failed attempt"""
+        pass
+
+    @abstractmethod
+    async def _publish_dead_letter(self, routing_key: str, message: StreamMessage[Any], headers: dict[str, str]) -> None:
+        """Publish a message which failed all its attempts to the dead-letter destination"""
+        pass
+
+    def _wrap_subscriber(
+        self,
+        subscriber: Subscriber,
+        message_type: type[Message],
+        routing_key: str,
+        validation: ValidationMode | None = None,
+        retry: RetryPolicy | None = None,
+        wait_retry_at: bool = False,
+    ) -> Subscriber:
+        """
+        Wrap a subscriber so its message is built according to the validation mode.
+
+        The wrapper takes the decoded body untyped, so FastStream does not validate it,
+        and builds the message type itself from the mode recorded by the publisher.
+        With a retry policy, handler errors are routed to the retry or dead-letter
+        destinations and the message is acknowledged without replying to its requester,
+        which gets the reply of the retried message or times out.
+        If 'wait_retry_at' is set, the wrapper waits until the message is due for retry
+        before handling it, for delay destinations the broker cannot delay itself.
+        """
+        subscription_mode = validation or self._settings.validation_mode
+
+        async def handler(body: Any, message: StreamMessage[Any] = Context()) -> Any:
+            if wait_retry_at and (retry_at := message.headers.get(RETRY_AT_HEADER)):
+                delay = int(retry_at) / 1000 - time.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+            if self._capture is not None:
+                self._capture.write(
+                    CaptureRecord(time.time(), CaptureDirection.consumed, routing_key, dict(message.headers), message.body)
+                )
+
+            try:
+                mode = resolve_validation_mode(subscription_mode, message.headers.get(VALIDATION_HEADER))
+                return await subscriber(build_message(message_type, body, mode))
+            except Exception as e:
+                if retry is None:
+                    raise
+                await self._handle_failure(routing_key, message, retry, e)
+                # Acknowledge without returning, FastStream would reply with an empty body
+                raise AckMessage() from e
+
+        # Not functools.wraps: FastStream would follow __wrapped__ and validate with the subscriber signature
+        handler.__name__ = subscriber.__name__
+        handler.__qualname__ = subscriber.__qualname__
+        handler.__doc__ = subscriber.__doc__
+        return handler
+
+    async def _handle_failure(
+        self,
+        routing_key: str,
+        message: StreamMessage[Any],
+        retry: RetryPolicy,
+        error: Exception,
+    ) -> None:
+        """Route a message whose handler raised to its retry or dead-letter destination"""
+        attempt = int(message.headers.get(ATTEMPT_HEADER, 1))
+        headers = {**message.headers, ORIGIN_HEADER: routing_key}
+
+        if attempt < retry.max_attempts:
+            delay_ms = retry.delay_ms(attempt)
+            headers[ATTEMPT_HEADER] = str(attempt + 1)
+            headers[RETRY_AT_HEADER] = str(int(time.time() * 1000) + delay_ms)
+            logger.warning(f"Attempt {attempt} failed for message from {routing_key}, retrying in {delay_ms}ms: {error}")
+            await self._publish_retry(routing_key, attempt, message, headers)
+            return
+
+        if not retry.dead_letter:
+            logger.error(f"Dropping message from {routing_key} after {attempt} attempts: {error}")
+            return
+
+        headers[ATTEMPT_HEADER] = str(attempt)
+        headers[ERROR_TYPE_HEADER] = type(error).__name__
+        headers[ERROR_MESSAGE_HEADER] = str(error)
+        headers[FAILED_AT_HEADER] = str(int(time.time() * 1000))
+        logger.error(f"Dead-lettering message from {routing_key} after {attempt} attempts: {error}")
+        await self._publish_dead_letter(routing_key, message, headers)
+
+    def _publish_headers(self) -> dict[str, str]:
+        """Build the headers attached to every published message"""
+        return {VALIDATION_HEADER: self._settings.validation_mode.value}
+
+    async def publish(self, message: Message) -> None:
+        """
+        Publish a message via the broker
+
+        With rate limits, the publish waits until the limits allow it, and its
+        latency feeds the adaptive limits.
+        """
+        if not self._broker:
+            raise RuntimeError("Broker is not initialized")
+
+        await self._send(message)
+
+    async def _send(self, message: Message, **options: Any) -> None:
+        """Publish a message within the rate limits"""
+        routing_key = self.get_routing_key(message)
+        if self._capture is not None:
+            self._capture.write(
+                CaptureRecord(
+                    time.time(),
+                    CaptureDirection.published,
+                    routing_key,
+                    self._publish_headers(),
+                    message.model_dump_json().encode(),
+                )
+            )
+
+        if self._limiter is None:
+            await self._publish(message, routing_key, **options)
+            return
+
+        await self._limiter.acquire(routing_key)
+        started = time.perf_counter()
+        try:
+            await self._publish(message, routing_key, **options)
+        except self._throttle_errors:
+            self._limiter.observe(routing_key, time.perf_counter() - started, throttled=True)
+            raise
+
+        self._limiter.observe(routing_key, time.perf_counter() - started)
+
+    async def request(self, message: Message, response_type: type[Message], timeout_sec: float | None = None) -> Message:
+        """
+        Publish a message and wait for the reply of its subscriber
+
+        Replies of every request are consumed from a single reply destination,
+        created on the first request, and matched to their request by correlation id.
+        The timeout covers both the publish and the wait for the reply.
+        """
+        if not self._broker:
+            raise RuntimeError("Broker is not initialized")
+
+        reply_to = await self._reply_destination()
+        correlation_id = uuid4().hex
+        future = asyncio.get_running_loop().create_future()
+        self._pending_replies[correlation_id] = future
+
+        timeout = timeout_sec if timeout_sec is not None else self._settings.timeout_ms / 1000
+        try:
+            async with asyncio.timeout(timeout):
+                await self._send(message, reply_to=reply_to, correlation_id=correlation_id)
+                body = await future
+        except TimeoutError as e:
+            raise TimeoutError(f"No reply to {type(message).__name__} within {timeout}s") from e
+        finally:
+            self._pending_replies.pop(correlation_id, None)
+
+        return build_message(response_type, body, ValidationMode.full)
+
+    async def _reply_destination(self) -> str:
+        """Get the reply destination of this broker, consuming it on first use"""
+        async with self._reply_lock:
+            if self._reply_to is not None:
+                return self._reply_to
+
+            if not self._is_consuming:
+                raise RuntimeError("Broker must be started to receive replies")
+
+            pending_replies = self._pending_replies
+
+            async def on_reply(body: Any, message: StreamMessage[Any] = Context()) -> None:
+                future = pending_replies.pop(message.correlation_id, None)
+                if future is None or future.done():
+                    logger.debug(f"Dropping reply to unknown or expired request {message.correlation_id}")
+                    return
+                future.set_result(body)
+
+            subscriber, reply_to = self._create_reply_subscriber()
+            subscriber(on_reply)
+            self._broker.setup_subscriber(subscriber)
+            await subscriber.start()
+            await self._ready_reply_subscriber(subscriber)
+
+            self._reply_to = reply_to
+            logger.info(f"Consuming replies from {reply_to}")
+            return reply_to
+
+    async def open(self, warmup: Sequence[type[Message]] | None = None) -> None:
+        """Open the broker connection, warming up the given message types"""
         if self._is_running:
             logger.warning("Broker is already running")
             return
@@ -42,6 +292,37 @@ class FaststreamBroker(Broker[SettingsType], ABC, Generic[SettingsType]):
             logger.error(f"Failed to connect to broker: {e}")
             raise ConnectionError(f"Failed to connect to broker: {e}") from e
 
+        if warmup:
+            try:
+                await self._warmup(warmup)
+                logger.info(f"Successfully warmed up {len(warmup)} message types")
+            except Exception as e:
+                logger.error(f"Failed to warm up broker: {e}")
+                # Close the connection so that the next open connects and warms up again
+                try:
+                    await self._broker.close()
+                except Exception as close_error:
+                    logger.error(f"Error closing broker connection: {close_error}")
+                finally:
+                    self._is_running = False
+                    self._broker = None
+                raise ConnectionError(f"Failed to warm up broker: {e}") from e
+
+        self._is_warm = True
+
+    async def health(self, timeout_sec: float | None = None) -> bool:
+        """Check the broker is connected and warmed up by pinging it, within the settings timeout by default"""
+        if not self._is_running or not self._is_warm or self._broker is None:
+            return False
+
+        # FastStream pings retry until their timeout, without one they never return on an unreachable broker
+        timeout = timeout_sec if timeout_sec is not None else self._settings.timeout_ms / 1000
+        try:
+            return await self._broker.ping(timeout)
+        except Exception as e:
+            logger.warning(f"Broker health check failed: {e}")
+            return False
+
     async def close(self) -> None:
         """Close the broker connection"""
         if not self._is_running:
@@ -57,7 +338,14 @@ class FaststreamBroker(Broker[SettingsType], ABC, Generic[SettingsType]):
                 raise
             finally:
                 self._is_running = False
+                self._is_consuming = False
+                self._is_warm = False
                 self._broker = None
+                self._reply_to = None
+                for future in self._pending_replies.values():
+                    if not future.done():
+                        future.set_exception(ConnectionError("Broker connection closed"))
+                self._pending_replies.clear()
 
     async def _start(self) -> None:
         """Start consuming messages"""
@@ -67,6 +355,7 @@ class FaststreamBroker(Broker[SettingsType], ABC, Generic[SettingsType]):
         try:
             logger.info("Starting message consumption")
             await self._broker.start()
+            self._is_consuming = True
         except Exception as e:
             logger.error(f"Error during message consumption: {e}")
             raise
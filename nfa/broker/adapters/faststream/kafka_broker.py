@@ -1,9 +1,18 @@
+import asyncio
 import logging
-from typing import cast
+from collections import defaultdict
+from typing import Any, Sequence, cast
 
+from aiokafka import TopicPartition
+from aiokafka.errors import KafkaTimeoutError
+from faststream.broker.message import StreamMessage
 from faststream.kafka import KafkaBroker as FaststreamKafkaBroker
+from faststream.kafka.subscriber.asyncapi import AsyncAPISubscriber
 
 from nfa.broker import Subscriber, Message
+from nfa.broker.enums import ValidationMode
+from nfa.broker.monitoring import PartitionLag, QueueDepth
+from nfa.broker.retry import RetryPolicy, dead_letter_routing_key, retry_routing_key
 from nfa.broker.settings import KafkaBrokerSettings
 
 from .faststream_broker import FaststreamBroker
@@ -13,6 +22,13 @@ logger = logging.getLogger(__name__)
 
 class KafkaBroker(FaststreamBroker[KafkaBrokerSettings]):
     """Kafka broker implementation using FastStream"""
+    _throttle_errors = (TimeoutError, KafkaTimeoutError)
+
+    def __init__(self, settings: KafkaBrokerSettings):
+        """Initialize the Kafka broker with settings"""
+        super().__init__(settings)
+        self._settings = settings
+        self._subscribers: list[AsyncAPISubscriber] = []
 
     def _create_broker(self) -> FaststreamKafkaBroker:
         """Create and configure the FastStream Kafka broker"""
@@ -53,16 +69,39 @@ class KafkaBroker(FaststreamBroker[KafkaBrokerSettings]):
         subscriber: Subscriber,
         message_type: type[Message],
         timeout_sec: float | None = None,
+        validation: ValidationMode | None = None,
+        retry: RetryPolicy | None = None,
     ) -> None:
-        """Subscribe to messages of a specific type"""
+        """
+        Subscribe to messages of a specific type
+
+        With a retry policy, each retry attempt gets its own topic with a fixed delay,
+        consumed next to the main topic. Kafka cannot delay messages, so the retry
+        consumers wait for each message to be due; as all messages of a retry topic
+        share the same delay, they are due in order and only that topic waits.
+        The longest retry delay must therefore stay below max_poll_interval_ms,
+        otherwise the waiting retry consumer would be evicted from its group.
+
+        Every subscription joins the consumer group of the settings group_id, so that
+        lag() reports its committed offsets. Subscriptions of the same message type in
+        one group split its partitions instead of each receiving every message: use
+        brokers with distinct group ids to deliver a message type to several handlers.
+        """
         if not self._broker:
             raise RuntimeError("Broker is not initialized")
+
+        if retry is not None and retry.retries and retry.delay_ms(retry.retries) >= self._settings.max_poll_interval_ms:
+            raise ValueError(
+                f"Retry delay of {retry.delay_ms(retry.retries)}ms must be below "
+                f"max_poll_interval_ms ({self._settings.max_poll_interval_ms}ms)"
+            )
             
         routing_key = self.get_routing_key(message_type)
         logger.info(f"Subscribing {subscriber.__name__} to {routing_key}")
         
         try:
             consumer_config = {
+                "group_id": self._settings.group_id,
                 "auto_offset_reset": self._settings.auto_offset_reset,
                 "auto_commit": self._settings.enable_auto_commit,
                 "auto_commit_interval_ms": self._settings.auto_commit_interval_ms,
@@ -73,28 +112,154 @@ class KafkaBroker(FaststreamBroker[KafkaBrokerSettings]):
                 "fetch_max_bytes": self._settings.fetch_max_bytes,
             }
             
+            session_timeout_ms = int(timeout_sec * 1000) if timeout_sec else self._settings.timeout_ms
+
             _subscribe = self._broker.subscriber(
                 routing_key,
                 **consumer_config,
-                session_timeout_ms=int(timeout_sec * 1000) if timeout_sec else self._settings.timeout_ms,
+                session_timeout_ms=session_timeout_ms,
             )
-            _subscribe(subscriber)
+            _subscribe(self._wrap_subscriber(subscriber, message_type, routing_key, validation, retry))
+            self._subscribers.append(_subscribe)
+
+            # Consume the retry topics of every retry attempt
+            if retry is not None:
+                for attempt in range(1, retry.retries + 1):
+                    _subscribe_retry = self._broker.subscriber(
+                        retry_routing_key(routing_key, attempt),
+                        **consumer_config,
+                        session_timeout_ms=session_timeout_ms,
+                    )
+                    _subscribe_retry(
+                        self._wrap_subscriber(subscriber, message_type, routing_key, validation, retry, wait_retry_at=True)
+                    )
+                    self._subscribers.append(_subscribe_retry)
             logger.debug(f"Successfully subscribed {subscriber.__name__} to {routing_key}")
         except Exception as e:
             logger.error(f"Failed to subscribe {subscriber.__name__} to {routing_key}: {e}")
             raise e
 
-    async def publish(self, message: Message) -> None:
-        """Publish a message to the broker"""
+    async def lag(self) -> list[PartitionLag]:
+        """
+        Get the lag of the consumers on every assigned partition
+
+        Without a consumer group there is no committed offset,
+        the lag is then computed from the consumer position.
+        """
         if not self._broker:
             raise RuntimeError("Broker is not initialized")
 
-        routing_key = self.get_routing_key(message)
+        lags = []
+        for subscriber in self._subscribers:
+            consumer = subscriber.consumer
+            if consumer is None:
+                continue
+
+            partitions = list(consumer.assignment())
+            if not partitions:
+                continue
+
+            end_offsets = await consumer.end_offsets(partitions)
+            for partition in partitions:
+                committed = await consumer.committed(partition) if self._settings.group_id else None
+                consumed = committed if committed is not None else await consumer.position(partition)
+                end_offset = end_offsets[partition]
+                lags.append(
+                    PartitionLag(
+                        topic=partition.topic,
+                        partition=partition.partition,
+                        committed=committed,
+                        end_offset=end_offset,
+                        lag=max(end_offset - consumed, 0),
+                    )
+                )
+
+        return lags
+
+    async def queue_depth(self) -> list[QueueDepth]:
+        """Get the number of pending messages of every subscribed topic, summing the lag of its partitions"""
+        messages: dict[str, int] = defaultdict(int)
+        for partition_lag in await self.lag():
+            messages[partition_lag.topic] += partition_lag.lag
+
+        return [QueueDepth(queue=topic, messages=count) for topic, count in messages.items()]
 
+    async def _publish(self, message: Message, routing_key: str, **options: Any) -> None:
+        """Publish a message to the topic of its routing key"""
         try:
             logger.info(f"Publishing {message} to {routing_key}")
-            await self._broker.publish(message=message, topic=routing_key)
+            await self._broker.publish(message=message, topic=routing_key, headers=self._publish_headers(), **options)
 
         except Exception as e:
             logger.error(f"Failed to publish {type(message).__name__} to {routing_key}: {e}")
-            raise
\ No newline at end of file
+            raise
+
+    async def _publish_retry(self, routing_key: str, attempt: int, message: StreamMessage[Any], headers: dict[str, str]) -> None:
+        """Publish a failed message to the retry topic of its failed attempt"""
+        await self._broker.publish(
+            message=message.body,
+            topic=retry_routing_key(routing_key, attempt),
+            key=message.raw_message.key,
+            headers=headers,
+            correlation_id=message.correlation_id,
+            reply_to=message.reply_to,
+        )
+
+    async def _publish_dead_letter(self, routing_key: str, message: StreamMessage[Any], headers: dict[str, str]) -> None:
+        """Publish a message which failed all its attempts to the dead-letter topic"""
+        await self._broker.publish(
+            message=message.body,
+            topic=dead_letter_routing_key(routing_key),
+            key=message.raw_message.key,
+            headers=headers,
+            correlation_id=message.correlation_id,
+            reply_to=message.reply_to,
+        )
+
+    def _create_reply_subscriber(self) -> tuple[AsyncAPISubscriber, str]:
+        """
+        Create the subscriber of the reply topic of this client instance, consumed outside of any group
+
+        The reply topic is named after the client and instance ids, so it is stable across restarts
+        and must exist or be auto-created by the cluster. Instances sharing a reply topic receive
+        each other's replies and drop those they did not request.
+        """
+        topic = self._settings.reply_topic_name
+        if topic is None:
+            raise RuntimeError("Set client_id or reply_topic in the Kafka settings to send requests")
+
+        return self._broker.subscriber(topic, auto_offset_reset="latest"), topic
+
+    async def _ready_reply_subscriber(self, subscriber: AsyncAPISubscriber) -> None:
+        """
+        Wait for the reply consumer to be assigned its partitions and resolve their end offsets
+
+        The "latest" offset is otherwise resolved on the first fetch, after replies to the
+        first requests may have been written, and those replies would be skipped.
+        """
+        consumer = subscriber.consumer
+        async with asyncio.timeout(self._settings.timeout_ms / 1000):
+            while not (partitions := consumer.assignment()):
+                await asyncio.sleep(0.05)
+
+            await consumer.seek_to_end(*partitions)
+            for partition in partitions:
+                await consumer.position(partition)
+
+    async def _warmup(self, message_types: Sequence[type[Message]]) -> None:
+        """Fetch the metadata of the message types topics and connect the producer to every partition leader"""
+        # FastStream does not expose the aiokafka producer it wraps
+        producer = getattr(getattr(self._broker, "_producer", None), "_producer", None)
+        if producer is None:
+            raise RuntimeError(
+                "Cannot warm up: the aiokafka producer of the FastStream Kafka broker was not found, "
+                "FastStream producer internals may have changed"
+            )
+        client = producer.client
+
+        for message_type in message_types:
+            topic = self.get_routing_key(message_type)
+            partitions = await producer.partitions_for(topic)
+            leaders = {client.cluster.leader_for_partition(TopicPartition(topic, partition)) for partition in partitions}
+            await asyncio.gather(*(client.ready(leader) for leader in leaders if leader is not None and leader >= 0))
+            logger.debug(f"Warmed up {topic} with {len(partitions)} partitions on {len(leaders)} leaders")
@@ -1,12 +1,18 @@
 import asyncio
 import logging
 from collections import defaultdict
-from typing import cast
+from typing import Any, Sequence, cast
+from uuid import uuid4
 
+from faststream.broker.message import StreamMessage
 from faststream.rabbit import RabbitBroker as FaststreamRabbitBroker, RabbitQueue, RabbitExchange
+from faststream.rabbit.subscriber.asyncapi import AsyncAPISubscriber
 from pydantic import BaseModel
 
 from nfa.broker import Subscriber
+from nfa.broker.enums import ValidationMode
+from nfa.broker.monitoring import QueueDepth
+from nfa.broker.retry import RetryPolicy, dead_letter_routing_key, retry_routing_key
 from nfa.broker.settings import RabbitBrokerSettings
 
 from .faststream_broker import FaststreamBroker
@@ -23,6 +29,7 @@ class RabbitBroker(FaststreamBroker[RabbitBrokerSettings]):
         self._settings = settings
         self._exchange: RabbitExchange | None = None
         self._message_type_to_queues: dict[type[BaseModel], set[RabbitQueue]] = defaultdict(set)
+        self._warmup_types: set[type[BaseModel]] = set()
 
     def _create_broker(self) -> FaststreamRabbitBroker:
         """Create and configure the FastStream RabbitMQ broker"""
@@ -52,8 +59,15 @@ class RabbitBroker(FaststreamBroker[RabbitBrokerSettings]):
         subscriber: Subscriber,
         message_type: type[BaseModel],
         timeout_sec: float | None = None,
+        validation: ValidationMode | None = None,
+        retry: RetryPolicy | None = None,
     ) -> None:
-        """Subscribe to messages of a specific type"""
+        """
+        Subscribe to messages of a specific type
+
+        With a retry policy, each retry attempt gets a delay queue whose messages
+        expire after the attempt backoff and are dead-lettered back to the subscriber queue.
+        """
         if not self._broker or not self._exchange:
             raise RuntimeError("Broker is not initialized")
             
@@ -78,7 +92,14 @@ class RabbitBroker(FaststreamBroker[RabbitBrokerSettings]):
                 timeout=(timeout_sec * 1000) or self._settings.consumer_timeout,
                 prefetch_count=self._settings.prefetch_count,
             )
-            _subscribe(subscriber)
+            _subscribe(self._wrap_subscriber(subscriber, message_type, queue_routing_key, validation, retry))
+
+            if retry is not None:
+                await self._declare_retry_queues(queue_routing_key, retry)
+
+            # Warmed up message types get their queues ready before consumption starts
+            if message_type in self._warmup_types:
+                await self._declare_bound_queue(queue)
 
             # Track the queue for publishing
             self._message_type_to_queues[message_type].add(queue)
@@ -88,9 +109,24 @@ class RabbitBroker(FaststreamBroker[RabbitBrokerSettings]):
             logger.error(f"Failed to subscribe {subscriber.__name__} to {queue_routing_key}: {e}")
             raise
 
-    async def publish(self, message: BaseModel) -> None:
+    async def queue_depth(self) -> list[QueueDepth]:
+        """Get the message and consumer counts of every subscribed queue from a passive declare"""
+        if not self._broker:
+            raise RuntimeError("Broker is not initialized")
+
+        queue_names = {queue.name for queues in self._message_type_to_queues.values() for queue in queues}
+        depths = []
+        for queue_name in sorted(queue_names):
+            # Declared queues are cached, declare again to refresh the counts
+            queue = await self._broker.declare_queue(RabbitQueue(queue_name, declare=False))
+            result = await queue.declare()
+            depths.append(QueueDepth(queue=queue_name, messages=result.message_count, consumers=result.consumer_count))
+
+        return depths
+
+    async def _publish(self, message: BaseModel, routing_key: str, **options: Any) -> None:
         """Publish a message to all queues of its type"""
-        if not self._broker or not self._exchange:
+        if not self._exchange:
             raise RuntimeError("Broker is not initialized")
 
         queues = self._message_type_to_queues[type(message)]
@@ -110,6 +146,8 @@ class RabbitBroker(FaststreamBroker[RabbitBrokerSettings]):
                         exchange=self._exchange,
                         mandatory=self._settings.mandatory,
                         delivery_mode=self._settings.delivery_mode,
+                        headers=self._publish_headers(),
+                        **options,
                     )
                     for queue in queues
                 ]
@@ -118,3 +156,89 @@ class RabbitBroker(FaststreamBroker[RabbitBrokerSettings]):
         except Exception as e:
             logger.error(f"Failed to publish message: {e}")
             raise
+
+    async def request(self, message: BaseModel, response_type: type[BaseModel], timeout_sec: float | None = None) -> BaseModel:
+        """
+        Publish a message to all queues of its type and wait for the first reply
+
+        Messages are only published to the queues subscribed by this broker,
+        requesting a message type without any would never get a reply.
+        """
+        if not self._message_type_to_queues.get(type(message)):
+            raise RuntimeError(f"No queues subscribed to {type(message).__name__}, the request cannot be answered")
+
+        return await super().request(message, response_type, timeout_sec)
+
+    async def _declare_retry_queues(self, queue_routing_key: str, retry: RetryPolicy) -> None:
+        """Declare the delay queues of every retry attempt and the dead-letter queue of a subscriber queue"""
+        for attempt in range(1, retry.retries + 1):
+            await self._broker.declare_queue(
+                RabbitQueue(
+                    name=retry_routing_key(queue_routing_key, attempt),
+                    durable=self._settings.queue_durable,
+                    auto_delete=self._settings.queue_auto_delete,
+                    arguments={
+                        "x-message-ttl": retry.delay_ms(attempt),
+                        "x-dead-letter-exchange": self._exchange.name,
+                        "x-dead-letter-routing-key": queue_routing_key,
+                    },
+                )
+            )
+
+        if retry.dead_letter:
+            await self._broker.declare_queue(
+                RabbitQueue(
+                    name=dead_letter_routing_key(queue_routing_key),
+                    durable=self._settings.queue_durable,
+                    auto_delete=False,
+                )
+            )
+
+    async def _publish_retry(self, routing_key: str, attempt: int, message: StreamMessage[Any], headers: dict[str, str]) -> None:
+        """Publish a failed message to the delay queue of its failed attempt"""
+        await self._broker.publish(
+            message=message.body,
+            queue=retry_routing_key(routing_key, attempt),
+            headers=headers,
+            content_type=message.content_type,
+            correlation_id=message.correlation_id,
+            reply_to=message.reply_to,
+            delivery_mode=self._settings.delivery_mode,
+        )
+
+    async def _publish_dead_letter(self, routing_key: str, message: StreamMessage[Any], headers: dict[str, str]) -> None:
+        """Publish a message which failed all its attempts to the dead-letter queue"""
+        await self._broker.publish(
+            message=message.body,
+            queue=dead_letter_routing_key(routing_key),
+            headers=headers,
+            content_type=message.content_type,
+            correlation_id=message.correlation_id,
+            reply_to=message.reply_to,
+            delivery_mode=self._settings.delivery_mode,
+        )
+
+    def _create_reply_subscriber(self) -> tuple[AsyncAPISubscriber, str]:
+        """Create the subscriber of an exclusive reply queue, replies are routed to it by the default exchange"""
+        queue = RabbitQueue(
+            name=f"nfa.reply.{uuid4().hex}",
+            durable=False,
+            exclusive=True,
+            auto_delete=True,
+        )
+        return self._broker.subscriber(queue), queue.name
+
+    async def _warmup(self, message_types: Sequence[type[BaseModel]]) -> None:
+        """Declare the exchange and the queues of the message types, and their queues subscribed later on"""
+        await self._broker.declare_exchange(self._exchange)
+        self._warmup_types.update(message_types)
+
+        for message_type in message_types:
+            for queue in self._message_type_to_queues.get(message_type, ()):
+                await self._declare_bound_queue(queue)
+
+    async def _declare_bound_queue(self, queue: RabbitQueue) -> None:
+        """Declare a queue and bind it to the exchange"""
+        exchange = await self._broker.declare_exchange(self._exchange)
+        declared_queue = await self._broker.declare_queue(queue)
+        await declared_queue.bind(exchange, routing_key=queue.routing)
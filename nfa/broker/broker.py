@@ -1,8 +1,12 @@
 import abc
-from typing import Any, Awaitable, Callable, TypeVar, Generic
+from typing import Any, Awaitable, Callable, Sequence, TypeVar, Generic
 
 from pydantic import BaseModel
 
+from nfa.broker.capture import CaptureWriter
+from nfa.broker.enums import ValidationMode
+from nfa.broker.monitoring import PartitionLag, QueueDepth
+from nfa.broker.retry import RetryPolicy
 from nfa.broker.settings import BaseBrokerSettings
 
 Subscriber = Callable[[Any], Awaitable[Any]]
@@ -27,6 +31,7 @@ class Broker(abc.ABC, Generic[T]):
         self._settings = settings
         self._is_running: bool = False
         self._broker = None
+        self._capture: CaptureWriter | None = None
 
     @property
     def is_running(self) -> bool:
@@ -34,11 +39,15 @@ class Broker(abc.ABC, Generic[T]):
         return self._is_running
 
     @abc.abstractmethod
-    async def open(self) -> None:
+    async def open(self, warmup: Sequence[type[Message]] | None = None) -> None:
         """
         Open the broker connection.
         
         Should be called before any other operations.
+
+        Args:
+            warmup: Optional message types whose topology and connections are prepared before returning
+
         Raises:
             ConnectionError: If connection cannot be established
         """
@@ -57,6 +66,8 @@ class Broker(abc.ABC, Generic[T]):
         subscriber: Subscriber,
         message_type: type[Message],
         timeout_sec: float | None = None,
+        validation: ValidationMode | None = None,
+        retry: RetryPolicy | None = None,
     ) -> None:
         """
         Subscribe a handler to messages of a specific type.
@@ -65,6 +76,13 @@ class Broker(abc.ABC, Generic[T]):
             subscriber: The handler to subscribe
             message_type: The type of messages to subscribe to
             timeout_sec: Optional timeout for the handler in seconds
+            validation: Optional validation mode, defaults to the settings validation mode
+            retry: Optional retry policy applied when the handler raises
+
+        Note:
+            Trusted and lazy validation only apply to messages whose publisher
+            recorded a non-full validation mode in their headers.
+            Without a retry policy, handler errors are raised back to the underlying broker.
         """
         pass
 
@@ -82,6 +100,74 @@ class Broker(abc.ABC, Generic[T]):
         """
         pass
 
+    def capture(self, writer: CaptureWriter | None) -> None:
+        """
+        Record every published and consumed message, or stop recording.
+
+        The writer is not closed when recording stops.
+
+        Args:
+            writer: The capture file writer, None to stop recording
+        """
+        self._capture = writer
+
+    async def health(self, timeout_sec: float | None = None) -> bool:
+        """
+        Check the broker is connected and ready, without publishing.
+
+        Args:
+            timeout_sec: Optional timeout for the check in seconds
+
+        Returns:
+            bool: True if the broker can serve traffic
+        """
+        return self.is_running
+
+    async def request(self, message: Message, response_type: type[Message], timeout_sec: float | None = None) -> Message:
+        """
+        Publish a message and wait for the reply of its subscriber.
+
+        The subscriber reply is the value returned by its handler.
+
+        Args:
+            message: The request message
+            response_type: The type of the reply message
+            timeout_sec: Optional timeout for the reply in seconds, defaults to the settings timeout
+
+        Returns:
+            Message: The reply, validated into the response type
+
+        Raises:
+            RuntimeError: If broker is not running
+            TimeoutError: If no reply arrived in time
+            NotImplementedError: If the broker does not support request/reply
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support request/reply")
+
+    async def lag(self) -> list[PartitionLag]:
+        """
+        Get the lag of the consumers on every assigned partition.
+
+        Returns:
+            list[PartitionLag]: The committed offset, end offset and lag per partition
+
+        Raises:
+            NotImplementedError: If the broker has no partitions
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not report partition lag")
+
+    async def queue_depth(self) -> list[QueueDepth]:
+        """
+        Get the number of pending messages of every subscribed queue.
+
+        Returns:
+            list[QueueDepth]: The pending messages and consumers per queue
+
+        Raises:
+            NotImplementedError: If the broker does not report queue depth
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not report queue depth")
+
     async def start(self) -> None:
         """
         Start consuming messages from the broker.
@@ -0,0 +1,174 @@
+"""
+Traffic capture.
+
+Brokers in capture mode record every published and consumed message to a local
+file, to be replayed later with `nfa.broker.replay`. The file starts with a magic
+header followed by length-prefixed records; it may be compressed as a single zstd
+stream, which requires the `capture` extra.
+"""
+import json
+import struct
+from importlib import util
+from os import PathLike
+from typing import BinaryIO, Iterator, NamedTuple
+
+from nfa.broker.enums import CaptureDirection
+
+MAGIC = b"NFAC\x01"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+# Record length, then timestamp, direction, routing key length and headers length
+_LENGTH = struct.Struct(">I")
+_RECORD_HEADER = struct.Struct(">dBHI")
+
+
+_DIRECTION_CODES = {CaptureDirection.published: 0, CaptureDirection.consumed: 1}
+_DIRECTIONS = {code: direction for direction, code in _DIRECTION_CODES.items()}
+
+
+class CaptureRecord(NamedTuple):
+    """A captured message"""
+    timestamp: float
+    direction: CaptureDirection
+    routing_key: str
+    headers: dict[str, str]
+    payload: bytes
+
+
+def is_zstd_available() -> bool:
+    """Check if zstd compression dependencies are available"""
+    return util.find_spec("zstandard") is not None
+
+
+def _import_zstd():
+    if not is_zstd_available():
+        raise ImportError(
+            "zstd compression is not available. "
+            "Please install the required dependencies with: "
+            "pip install 'nfa-broker[capture]'"
+        )
+    import zstandard
+    return zstandard
+
+
+class CaptureWriter:
+    """Write captured messages to a file"""
+
+    def __init__(self, path: str | PathLike, compress: bool = False, compression_level: int = 3):
+        """
+        Open the capture file, truncating it.
+
+        Args:
+            path: The capture file path
+            compress: Whether to compress the file with zstd
+            compression_level: The zstd compression level
+        """
+        self._file = open(path, "wb")
+        self._stream: BinaryIO = self._file
+        if compress:
+            zstandard = _import_zstd()
+            self._stream = zstandard.ZstdCompressor(level=compression_level).stream_writer(self._file, closefd=False)
+
+        self._stream.write(MAGIC)
+        self._records = 0
+
+    @property
+    def records(self) -> int:
+        """The number of records written"""
+        return self._records
+
+    def write(self, record: CaptureRecord) -> None:
+        """Append a record to the capture file"""
+        routing_key = record.routing_key.encode()
+        headers = json.dumps(record.headers, separators=(",", ":"), default=str).encode()
+        header = _RECORD_HEADER.pack(record.timestamp, _DIRECTION_CODES[record.direction], len(routing_key), len(headers))
+
+        self._stream.write(_LENGTH.pack(len(header) + len(routing_key) + len(headers) + len(record.payload)))
+        self._stream.write(header)
+        self._stream.write(routing_key)
+        self._stream.write(headers)
+        self._stream.write(record.payload)
+        self._records += 1
+
+    def close(self) -> None:
+        """Flush and close the capture file"""
+        if self._stream is not self._file:
+            self._stream.close()
+        self._file.close()
+
+    def __enter__(self) -> "CaptureWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def _read_exact(stream: BinaryIO, size: int) -> bytes:
+    """Read exactly 'size' bytes, or nothing at the end of the stream"""
+    data = stream.read(size)
+    while 0 < len(data) < size:
+        chunk = stream.read(size - len(data))
+        if not chunk:
+            break
+        data += chunk
+
+    if data and len(data) < size:
+        raise ValueError("Truncated capture file")
+
+    return data
+
+
+class _ZstdReader:
+    """Decompress a zstd capture file, detecting truncated streams"""
+
+    _CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, file: BinaryIO):
+        zstandard = _import_zstd()
+        self._file = file
+        self._decompressor = zstandard.ZstdDecompressor().decompressobj()
+        self._buffer = bytearray()
+
+    def read(self, size: int) -> bytes:
+        while len(self._buffer) < size and not self._decompressor.eof:
+            chunk = self._file.read(self._CHUNK_SIZE)
+            if not chunk:
+                raise ValueError("Truncated capture file")
+            self._buffer += self._decompressor.decompress(chunk)
+
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+
+def read_capture(path: str | PathLike) -> Iterator[CaptureRecord]:
+    """
+    Read the records of a capture file, compressed or not.
+
+    Args:
+        path: The capture file path
+
+    Yields:
+        CaptureRecord: The captured messages in capture order
+    """
+    with open(path, "rb") as file:
+        stream: BinaryIO = file
+        if file.peek(len(ZSTD_MAGIC))[:len(ZSTD_MAGIC)] == ZSTD_MAGIC:
+            stream = _ZstdReader(file)
+
+        if _read_exact(stream, len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a capture file")
+
+        while length := _read_exact(stream, _LENGTH.size):
+            record = _read_exact(stream, _LENGTH.unpack(length)[0])
+            if not record:
+                raise ValueError("Truncated capture file")
+
+            timestamp, direction, routing_key_length, headers_length = _RECORD_HEADER.unpack_from(record)
+            offset = _RECORD_HEADER.size
+            routing_key = record[offset:offset + routing_key_length].decode()
+            offset += routing_key_length
+            headers = json.loads(record[offset:offset + headers_length])
+            offset += headers_length
+
+            yield CaptureRecord(timestamp, _DIRECTIONS[direction], routing_key, headers, record[offset:])
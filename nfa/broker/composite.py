@@ -0,0 +1,260 @@
+"""
+Composite broker.
+
+A single `Broker` facade over several brokers, e.g. several Kafka clusters or
+RabbitMQ virtual hosts. Messages are routed to shards by routing key pattern and
+keyed messages are consistently hashed across the shards of their route.
+"""
+import asyncio
+import bisect
+import hashlib
+import itertools
+import logging
+from fnmatch import fnmatchcase
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Iterator, Sequence, TypeVar
+
+from nfa.broker import Broker, Message, Subscriber
+from nfa.broker.capture import CaptureWriter
+from nfa.broker.enums import ValidationMode
+from nfa.broker.monitoring import PartitionLag, QueueDepth
+from nfa.broker.retry import RetryPolicy
+from nfa.broker.settings import CompositeBrokerSettings
+
+logger = logging.getLogger(__name__)
+
+Result = TypeVar("Result")
+
+
+class HashRing:
+    """Consistent hash ring mapping keys to nodes"""
+
+    def __init__(self, nodes: Sequence[str], virtual_nodes: int = 100):
+        """
+        Initialize the ring.
+
+        Args:
+            nodes: The nodes of the ring
+            virtual_nodes: The number of points of every node on the ring
+        """
+        if not nodes:
+            raise ValueError("At least one node must be specified")
+
+        points = sorted(
+            (self._hash(f"{node}#{index}"), node)
+            for node in nodes
+            for index in range(virtual_nodes)
+        )
+        self._hashes = [point for point, _ in points]
+        self._nodes = [node for _, node in points]
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+    def node(self, key: str) -> str:
+        """Get the node owning a key"""
+        index = bisect.bisect(self._hashes, self._hash(key))
+        return self._nodes[index % len(self._nodes)]
+
+
+class _ShardSet:
+    """Shards a routing key is routed to"""
+
+    def __init__(self, shards: list[str], virtual_nodes: int):
+        self.shards = shards
+        self._ring = HashRing(shards, virtual_nodes) if len(shards) > 1 else None
+        self._round_robin: Iterator[str] = itertools.cycle(shards)
+
+    def select(self, shard_key: str | None) -> str:
+        """Select the shard of a message from its shard key"""
+        if self._ring is None:
+            return self.shards[0]
+
+        if shard_key is None:
+            return next(self._round_robin)
+
+        return self._ring.node(shard_key)
+
+
+def get_shard_key(message: Message) -> str | None:
+    """
+    Get the shard key of a message.
+
+    Note:
+        If 'message' has a shard_key attribute, it will be used directly.
+        If 'message' has a shard_key method, it will be called.
+        Otherwise the message is not keyed.
+    """
+    shard_key = getattr(message, "shard_key", None)
+    if callable(shard_key):
+        shard_key = shard_key()
+
+    if shard_key is not None and not isinstance(shard_key, str):
+        raise ValueError(f"Fetched shard key from message must be a string. Got: {shard_key}")
+
+    return shard_key
+
+
+class CompositeBroker(Broker[CompositeBrokerSettings]):
+    """Broker routing messages across several shard brokers"""
+
+    def __init__(self, settings: CompositeBrokerSettings, shards: dict[str, Broker]):
+        """
+        Initialize the composite broker.
+
+        Args:
+            settings: Composite broker settings
+            shards: The shard brokers by name, matching the settings shards
+        """
+        super().__init__(settings)
+        missing = set(settings.shards) - set(shards)
+        if missing:
+            raise ValueError(f"Missing brokers for shards {sorted(missing)}")
+
+        self._shards = shards
+        self._routes: dict[str, _ShardSet] = {}
+
+    @property
+    def shards(self) -> dict[str, Broker]:
+        """The shard brokers by name"""
+        return self._shards
+
+    def _route(self, routing_key: str) -> _ShardSet:
+        """Resolve the shards of a routing key, caching the result"""
+        shard_set = self._routes.get(routing_key)
+        if shard_set is not None:
+            return shard_set
+
+        for route in self._settings.routes:
+            if fnmatchcase(routing_key, route.pattern):
+                shard_set = _ShardSet(route.shards, self._settings.virtual_nodes)
+                break
+        else:
+            if self._settings.default_shard is None:
+                raise ValueError(f"No shard found for routing key {routing_key}")
+            shard_set = _ShardSet([self._settings.default_shard], self._settings.virtual_nodes)
+
+        self._routes[routing_key] = shard_set
+        return shard_set
+
+    async def _gather(self, call: Callable[[Broker], Awaitable[Result]], names: Sequence[str] | None = None) -> dict[str, Result]:
+        """Run a call on several shards in parallel, raising the first error once all calls ended"""
+        names = list(self._shards) if names is None else names
+        results = await asyncio.gather(*(call(self._shards[name]) for name in names), return_exceptions=True)
+        for name, result in zip(names, results):
+            if isinstance(result, BaseException):
+                logger.error(f"Shard {name} failed: {result}")
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
+        return dict(zip(names, results))
+
+    async def open(self, warmup: Sequence[type[Message]] | None = None) -> None:
+        """Open the connections of every shard, warming up each shard with the message types routed to it"""
+        if self._is_running:
+            logger.warning("Broker is already running")
+            return
+
+        shard_warmup: dict[Broker, list[type[Message]]] = defaultdict(list)
+        for message_type in warmup or ():
+            for name in self._route(self.get_routing_key(message_type)).shards:
+                shard_warmup[self._shards[name]].append(message_type)
+
+        try:
+            await self._gather(lambda shard: shard.open(warmup=shard_warmup.get(shard)))
+        except Exception as e:
+            # Do not leave the shards which could connect open
+            await asyncio.gather(
+                *(shard.close() for shard in self._shards.values() if shard.is_running),
+                return_exceptions=True,
+            )
+            raise ConnectionError(f"Failed to connect to broker: {e}") from e
+
+        self._is_running = True
+        logger.info(f"Successfully connected to {len(self._shards)} shards")
+
+    def capture(self, writer: CaptureWriter | None) -> None:
+        """Record the messages of every shard to the same writer, or stop recording"""
+        super().capture(writer)
+        for shard in self._shards.values():
+            shard.capture(writer)
+
+    async def health(self, timeout_sec: float | None = None) -> bool:
+        """Check every shard is healthy"""
+        if not self._is_running:
+            return False
+
+        results = await asyncio.gather(*(shard.health(timeout_sec) for shard in self._shards.values()))
+        return all(results)
+
+    async def close(self) -> None:
+        """Close the connections of every shard"""
+        if not self._is_running:
+            logger.warning("Broker is not running")
+            return
+
+        try:
+            running = [name for name, shard in self._shards.items() if shard.is_running]
+            await self._gather(lambda shard: shard.close(), running)
+        finally:
+            self._is_running = False
+
+    async def subscribe(
+        self,
+        subscriber: Subscriber,
+        message_type: type[Message],
+        timeout_sec: float | None = None,
+        validation: ValidationMode | None = None,
+        retry: RetryPolicy | None = None,
+    ) -> None:
+        """Subscribe to messages of a specific type on every shard of its route"""
+        routing_key = self.get_routing_key(message_type)
+        shard_set = self._route(routing_key)
+        logger.info(f"Subscribing {subscriber.__name__} to {routing_key} on shards {shard_set.shards}")
+
+        await self._gather(
+            lambda shard: shard.subscribe(subscriber, message_type, timeout_sec, validation, retry),
+            shard_set.shards,
+        )
+
+    async def publish(self, message: Message) -> None:
+        """Publish a message to the shard selected by its routing key and shard key"""
+        shard = self._route(self.get_routing_key(message)).select(get_shard_key(message))
+        await self._shards[shard].publish(message)
+
+    async def request(self, message: Message, response_type: type[Message], timeout_sec: float | None = None) -> Message:
+        """Send a request to the shard selected by its routing key and shard key"""
+        shard = self._route(self.get_routing_key(message)).select(get_shard_key(message))
+        return await self._shards[shard].request(message, response_type, timeout_sec)
+
+    async def _start(self) -> None:
+        """Start consuming messages on every shard"""
+        await self._gather(lambda shard: shard.start())
+
+    async def lag(self) -> list[PartitionLag]:
+        """Get the lag of every shard reporting it"""
+        lags = await self._collect(lambda shard: shard.lag())
+        return [lag.model_copy(update={"broker": name}) for name, shard_lags in lags.items() for lag in shard_lags]
+
+    async def queue_depth(self) -> list[QueueDepth]:
+        """Get the queue depth of every shard reporting it"""
+        depths = await self._collect(lambda shard: shard.queue_depth())
+        return [depth.model_copy(update={"broker": name}) for name, shard_depths in depths.items() for depth in shard_depths]
+
+    async def _collect(self, call: Callable[[Broker], Awaitable[list[Any]]]) -> dict[str, list[Any]]:
+        """Run a monitoring call on every shard, skipping the shards which do not implement it"""
+
+        async def _call(shard: Broker) -> list[Any] | None:
+            try:
+                return await call(shard)
+            except NotImplementedError:
+                return None
+
+        results = await self._gather(_call)
+        collected = {name: result for name, result in results.items() if result is not None}
+        if not collected:
+            raise NotImplementedError("No shard reports this metric")
+
+        return collected
@@ -6,4 +6,22 @@ class BrokerType(StrEnum):
     Enum for different broker types
     """
     faststream_kafka = "faststream.kafka"
-    faststream_rabbit = "faststream.rabbit"
\ No newline at end of file
+    faststream_rabbit = "faststream.rabbit"
+    composite = "composite"
+
+
+class ValidationMode(StrEnum):
+    """
+    Enum for the ways a consumed payload is turned into its message type
+    """
+    full = "full"
+    trusted = "trusted"
+    lazy = "lazy"
+
+
+class CaptureDirection(StrEnum):
+    """
+    Enum for the direction of a captured message
+    """
+    published = "published"
+    consumed = "consumed"
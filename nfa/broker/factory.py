@@ -15,5 +15,10 @@ def broker_factory(settings: BrokerSettings) -> Broker:
             broker_class = get_rabbit_broker()
             return broker_class(settings)
 
+        case BrokerType.composite:
+            from nfa.broker.composite import CompositeBroker
+            shards = {name: broker_factory(shard_settings) for name, shard_settings in settings.shards.items()}
+            return CompositeBroker(settings, shards)
+
         case _:
             raise BrokerNotAvailable(settings.broker_type)
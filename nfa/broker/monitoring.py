@@ -0,0 +1,123 @@
+"""
+Consumer lag and queue depth monitoring.
+
+Brokers report how far behind their consumers are through `Broker.lag()` and
+`Broker.queue_depth()`. The `LagSampler` polls both periodically and hands the
+samples to a pluggable sink, e.g. an autoscaler or a metrics exporter.
+"""
+import asyncio
+import logging
+import time
+from typing import TYPE_CHECKING, Awaitable, Callable
+
+from pydantic import BaseModel
+
+if TYPE_CHECKING:
+    from nfa.broker.broker import Broker
+
+logger = logging.getLogger(__name__)
+
+
+class PartitionLag(BaseModel):
+    """Lag of a consumer on a single Kafka partition"""
+    topic: str
+    partition: int
+    committed: int | None
+    end_offset: int
+    lag: int
+    # Name of the shard reporting the lag, set by composite brokers
+    broker: str | None = None
+
+
+class QueueDepth(BaseModel):
+    """Pending messages of a queue or topic"""
+    queue: str
+    messages: int
+    consumers: int | None = None
+    # Name of the shard reporting the depth, set by composite brokers
+    broker: str | None = None
+
+
+class LagSample(BaseModel):
+    """Lag and queue depth of a broker at a point in time"""
+    timestamp: float
+    partitions: list[PartitionLag]
+    queues: list[QueueDepth]
+
+
+LagSink = Callable[[LagSample], Awaitable[None]]
+
+
+class LagSampler:
+    """
+    Periodically sample the lag and queue depth of a broker into a sink.
+
+    Brokers which do not report lag or queue depth yield empty lists.
+    Sampling and sink errors are logged and do not stop the sampler.
+    """
+
+    def __init__(self, broker: "Broker", sink: LagSink, interval_sec: float = 10.0):
+        """
+        Initialize the sampler.
+
+        Args:
+            broker: The broker to sample
+            sink: The coroutine function receiving every sample
+            interval_sec: The delay between two samples in seconds
+        """
+        if interval_sec <= 0:
+            raise ValueError("Interval must be positive")
+
+        self._broker = broker
+        self._sink = sink
+        self._interval_sec = interval_sec
+        self._task: asyncio.Task | None = None
+
+    @property
+    def is_running(self) -> bool:
+        """Check if the sampler is currently running"""
+        return self._task is not None and not self._task.done()
+
+    async def sample(self) -> LagSample:
+        """Take a single sample of the broker"""
+        try:
+            partitions = await self._broker.lag()
+        except NotImplementedError:
+            partitions = []
+
+        try:
+            queues = await self._broker.queue_depth()
+        except NotImplementedError:
+            queues = []
+
+        return LagSample(timestamp=time.time(), partitions=partitions, queues=queues)
+
+    def start(self) -> None:
+        """Start sampling in the background"""
+        if self.is_running:
+            logger.warning("Lag sampler is already running")
+            return
+
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop sampling"""
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self._sink(await self.sample())
+            except Exception as e:
+                logger.error(f"Failed to sample broker lag: {e}")
+
+            await asyncio.sleep(self._interval_sec)
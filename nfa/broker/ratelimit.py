@@ -0,0 +1,234 @@
+"""
+Publisher rate limiting.
+
+Token buckets reserve their tokens up front: a caller beyond the limit takes a
+token in advance and sleeps once until it is due, so waiting callers are served
+in order without locks or polling. Tokens of cancelled callers are refunded, and
+the tokens taken in advance are capped to a maximum wait.
+"""
+import asyncio
+import time
+
+from nfa.broker.settings import RateLimitSettings
+
+
+class TokenBucket:
+    """Token bucket shared by the coroutines of an event loop"""
+    __slots__ = ("_rate", "_burst", "_max_wait_sec", "_tokens", "_updated")
+
+    def __init__(self, rate: float, burst: float | None = None, max_wait_sec: float = 60.0):
+        """
+        Initialize the bucket full.
+
+        Args:
+            rate: The number of tokens added per second
+            burst: The capacity of the bucket, defaults to one second of tokens
+            max_wait_sec: The maximum wait of a reserved token, callers beyond it wait before reserving
+        """
+        if rate <= 0:
+            raise ValueError("Rate must be positive")
+        if max_wait_sec <= 0:
+            raise ValueError("Max wait must be positive")
+
+        self._rate = rate
+        self._burst = burst if burst is not None else max(rate, 1.0)
+        self._max_wait_sec = max_wait_sec
+        self._tokens = self._burst
+        self._updated = time.monotonic()
+
+    @property
+    def rate(self) -> float:
+        """The number of tokens added per second"""
+        return self._rate
+
+    @rate.setter
+    def rate(self, rate: float) -> None:
+        self._refill(time.monotonic())
+        self._rate = rate
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self._burst, self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+
+    def reserve(self) -> float | None:
+        """
+        Take a token, in advance if the bucket is empty.
+
+        Returns:
+            float | None: The number of seconds to wait before the token is available,
+                None if the token would be due after the maximum wait and was not taken
+        """
+        self._refill(time.monotonic())
+        if self._tokens - 1 < -self._max_wait_sec * self._rate:
+            return None
+
+        self._tokens -= 1
+        if self._tokens >= 0:
+            return 0.0
+
+        return -self._tokens / self._rate
+
+    def reserve_delay(self) -> float:
+        """Get the number of seconds until a token can be reserved again"""
+        self._refill(time.monotonic())
+        return max(0.0, (-self._max_wait_sec * self._rate - (self._tokens - 1)) / self._rate)
+
+    def refund(self) -> None:
+        """Give back a reserved token which was not used"""
+        self._tokens = min(self._burst, self._tokens + 1)
+
+    async def acquire(self) -> None:
+        """Take a token, waiting until it is available"""
+        while (delay := self.reserve()) is None:
+            await asyncio.sleep(self.reserve_delay())
+
+        if delay > 0:
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                self.refund()
+                raise
+
+
+class AdaptiveTokenBucket(TokenBucket):
+    """
+    Token bucket lowering its rate when publish latency rises or the broker throttles.
+
+    The rate is adjusted at most once per interval: it is multiplied by the decrease
+    factor when the smoothed latency exceeds its target or a throttle was observed,
+    and recovers linearly towards its configured rate otherwise.
+    """
+    __slots__ = (
+        "_max_rate",
+        "_min_rate",
+        "_target_latency_sec",
+        "_adjust_interval_sec",
+        "_decrease_factor",
+        "_increase_step",
+        "_latency_sec",
+        "_throttled",
+        "_adjusted",
+    )
+
+    # Weight of the last observation in the smoothed latency
+    _LATENCY_SMOOTHING = 0.2
+
+    def __init__(
+        self,
+        rate: float,
+        burst: float | None = None,
+        max_wait_sec: float = 60.0,
+        min_rate: float = 1.0,
+        target_latency_sec: float = 0.1,
+        adjust_interval_sec: float = 1.0,
+        decrease_factor: float = 0.5,
+        increase_ratio: float = 0.05,
+    ):
+        super().__init__(rate, burst, max_wait_sec)
+        self._max_rate = rate
+        self._min_rate = min(min_rate, rate)
+        self._target_latency_sec = target_latency_sec
+        self._adjust_interval_sec = adjust_interval_sec
+        self._decrease_factor = decrease_factor
+        self._increase_step = rate * increase_ratio
+        self._latency_sec = 0.0
+        self._throttled = False
+        self._adjusted = time.monotonic()
+
+    def observe(self, latency_sec: float, throttled: bool = False) -> None:
+        """
+        Record the outcome of a publish.
+
+        Args:
+            latency_sec: The publish latency in seconds
+            throttled: Whether the broker throttled or timed out the publish
+        """
+        self._latency_sec += self._LATENCY_SMOOTHING * (latency_sec - self._latency_sec)
+        self._throttled = self._throttled or throttled
+
+        now = time.monotonic()
+        if now - self._adjusted < self._adjust_interval_sec:
+            return
+
+        if self._throttled or self._latency_sec > self._target_latency_sec:
+            self.rate = max(self._min_rate, self._rate * self._decrease_factor)
+        elif self._rate < self._max_rate:
+            self.rate = min(self._max_rate, self._rate + self._increase_step)
+
+        self._throttled = False
+        self._adjusted = now
+
+
+class PublishLimiter:
+    """Broker-wide and per routing key rate limits of a publisher"""
+
+    def __init__(self, settings: RateLimitSettings):
+        self._settings = settings
+        self._broker_bucket = self._create_bucket(settings.messages_per_sec)
+        self._buckets: dict[str, TokenBucket | None] = {}
+
+    def _create_bucket(self, rate: float | None) -> TokenBucket | None:
+        if rate is None:
+            return None
+
+        settings = self._settings
+        max_wait_sec = settings.max_wait_ms / 1000
+        if not settings.adaptive:
+            return TokenBucket(rate, settings.burst, max_wait_sec)
+
+        return AdaptiveTokenBucket(
+            rate,
+            settings.burst,
+            max_wait_sec,
+            min_rate=settings.min_messages_per_sec,
+            target_latency_sec=settings.target_latency_ms / 1000,
+            adjust_interval_sec=settings.adjust_interval_ms / 1000,
+            decrease_factor=settings.decrease_factor,
+            increase_ratio=settings.increase_ratio,
+        )
+
+    def _routing_key_bucket(self, routing_key: str) -> TokenBucket | None:
+        try:
+            return self._buckets[routing_key]
+        except KeyError:
+            rate = self._settings.routing_keys.get(routing_key, self._settings.routing_key_messages_per_sec)
+            bucket = self._buckets[routing_key] = self._create_bucket(rate)
+            return bucket
+
+    async def acquire(self, routing_key: str) -> None:
+        """Wait until a message can be published to a routing key"""
+        buckets = [bucket for bucket in (self._routing_key_bucket(routing_key), self._broker_bucket) if bucket is not None]
+
+        while True:
+            delay = 0.0
+            reserved: list[TokenBucket] = []
+            for bucket in buckets:
+                bucket_delay = bucket.reserve()
+                if bucket_delay is None:
+                    break
+                reserved.append(bucket)
+                delay = max(delay, bucket_delay)
+            else:
+                break
+
+            # A bucket is beyond its maximum wait: give the tokens back and wait for it
+            for reserved_bucket in reserved:
+                reserved_bucket.refund()
+            await asyncio.sleep(bucket.reserve_delay())
+
+        if delay > 0:
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                for bucket in buckets:
+                    bucket.refund()
+                raise
+
+    def observe(self, routing_key: str, latency_sec: float, throttled: bool = False) -> None:
+        """Record the outcome of a publish to a routing key for the adaptive buckets"""
+        if not self._settings.adaptive:
+            return
+
+        for bucket in (self._buckets.get(routing_key), self._broker_bucket):
+            if bucket is not None:
+                bucket.observe(latency_sec, throttled)
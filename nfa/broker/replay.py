@@ -0,0 +1,144 @@
+"""
+Traffic replay.
+
+Push the messages of a capture file back through any broker, at the captured
+rate or faster, and report the throughput and publish latency.
+"""
+import asyncio
+import logging
+import time
+from os import PathLike
+from typing import Sequence
+
+from pydantic import BaseModel
+
+from nfa.broker import Broker, Message
+from nfa.broker.capture import read_capture
+from nfa.broker.enums import CaptureDirection
+
+logger = logging.getLogger(__name__)
+
+
+class ReplayReport(BaseModel):
+    """Outcome of a replay"""
+    messages: int
+    failed: int
+    skipped: int
+    duration_sec: float
+    throughput_per_sec: float
+    latency_p50_ms: float
+    latency_p95_ms: float
+    latency_p99_ms: float
+    latency_max_ms: float
+
+
+def _percentile(sorted_values: list[float], percentile: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * percentile))
+    return sorted_values[index]
+
+
+async def replay(
+    path: str | PathLike,
+    broker: Broker,
+    message_types: Sequence[type[Message]],
+    speed: float | None = 1.0,
+    direction: CaptureDirection = CaptureDirection.published,
+    concurrency: int = 100,
+) -> ReplayReport:
+    """
+    Publish the captured messages of a capture file through a broker.
+
+    Args:
+        path: The capture file path
+        broker: The broker to publish through, opened by the caller
+        message_types: The message types to decode the captured payloads into, by routing key
+        speed: The replay rate relative to the captured rate, None to replay as fast as possible
+        direction: The captured messages to replay
+        concurrency: The maximum number of publishes in flight
+
+    Returns:
+        ReplayReport: The throughput and publish latency of the replay
+
+    Note:
+        Records of another direction or of a routing key without message type are skipped,
+        records which cannot be decoded into their message type are counted as failed.
+    """
+    if speed is not None and speed <= 0:
+        raise ValueError("Speed must be positive")
+    if concurrency < 1:
+        raise ValueError("Concurrency must be positive")
+
+    types_by_routing_key = {Broker.get_routing_key(message_type): message_type for message_type in message_types}
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    failed = 0
+    skipped = 0
+
+    async def _publish(message: Message) -> None:
+        nonlocal failed
+        try:
+            started = time.perf_counter()
+            await broker.publish(message)
+            latencies.append(time.perf_counter() - started)
+        except Exception as e:
+            failed += 1
+            logger.error(f"Failed to replay {type(message).__name__}: {e}")
+        finally:
+            semaphore.release()
+
+    tasks: set[asyncio.Task] = set()
+    first_timestamp: float | None = None
+    started = time.perf_counter()
+    try:
+        for record in read_capture(path):
+            message_type = types_by_routing_key.get(record.routing_key)
+            if record.direction != direction or message_type is None:
+                skipped += 1
+                continue
+
+            if speed is not None:
+                if first_timestamp is None:
+                    first_timestamp = record.timestamp
+                delay = (record.timestamp - first_timestamp) / speed - (time.perf_counter() - started)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+            try:
+                message = message_type.model_validate_json(record.payload)
+            except ValueError as e:
+                failed += 1
+                logger.error(f"Failed to decode captured {message_type.__name__}: {e}")
+                continue
+
+            await semaphore.acquire()
+            task = asyncio.create_task(_publish(message))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        await asyncio.gather(*tasks)
+    except BaseException:
+        # Do not leave publishes running past an unreadable capture or a cancelled replay
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+    duration = time.perf_counter() - started
+
+    latencies.sort()
+    messages = len(latencies)
+    report = ReplayReport(
+        messages=messages,
+        failed=failed,
+        skipped=skipped,
+        duration_sec=duration,
+        throughput_per_sec=messages / duration if duration > 0 else 0.0,
+        latency_p50_ms=_percentile(latencies, 0.50) * 1000,
+        latency_p95_ms=_percentile(latencies, 0.95) * 1000,
+        latency_p99_ms=_percentile(latencies, 0.99) * 1000,
+        latency_max_ms=(latencies[-1] if latencies else 0.0) * 1000,
+    )
+    logger.info(f"Replayed {messages} messages in {duration:.2f}s ({report.throughput_per_sec:.0f} msg/s)")
+    return report
@@ -0,0 +1,71 @@
+"""
+Retry and dead-letter policies.
+
+A failed message is not retried in place: it is republished to a delay destination
+for its attempt and comes back to the subscriber once the delay elapsed. When all
+attempts failed, the message is published to a dead-letter destination recording
+the failure.
+"""
+from pydantic import BaseModel, validator
+
+ATTEMPT_HEADER = "x-nfa-attempt"
+RETRY_AT_HEADER = "x-nfa-retry-at"
+ORIGIN_HEADER = "x-nfa-origin"
+ERROR_TYPE_HEADER = "x-nfa-error-type"
+ERROR_MESSAGE_HEADER = "x-nfa-error"
+FAILED_AT_HEADER = "x-nfa-failed-at"
+
+
+class RetryPolicy(BaseModel):
+    """Retry policy of a subscription"""
+    # Total number of handler attempts, including the first delivery
+    max_attempts: int = 3
+    backoff_ms: int = 1000
+    backoff_multiplier: float = 2.0
+    max_backoff_ms: int = 60000
+    dead_letter: bool = True
+
+    @validator("max_attempts")
+    def validate_max_attempts(cls, v):
+        if v < 1:
+            raise ValueError("Max attempts must be positive")
+        return v
+
+    @validator("backoff_ms", "max_backoff_ms")
+    def validate_backoff(cls, v):
+        if v <= 0:
+            raise ValueError("Backoff must be positive")
+        return v
+
+    @validator("backoff_multiplier")
+    def validate_backoff_multiplier(cls, v):
+        if v < 1:
+            raise ValueError("Backoff multiplier must be at least 1")
+        return v
+
+    @property
+    def retries(self) -> int:
+        """Number of retries after the first delivery"""
+        return self.max_attempts - 1
+
+    def delay_ms(self, attempt: int) -> int:
+        """
+        Get the delay before retrying a message which failed its given attempt.
+
+        Args:
+            attempt: The failed attempt, starting at 1
+
+        Returns:
+            int: The delay in milliseconds
+        """
+        return int(min(self.backoff_ms * self.backoff_multiplier ** (attempt - 1), self.max_backoff_ms))
+
+
+def retry_routing_key(routing_key: str, attempt: int) -> str:
+    """Build the routing key of the delay destination for a failed attempt"""
+    return f"{routing_key}.retry.{attempt}"
+
+
+def dead_letter_routing_key(routing_key: str) -> str:
+    """Build the routing key of the dead-letter destination"""
+    return f"{routing_key}.dlq"
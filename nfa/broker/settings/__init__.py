@@ -6,16 +6,21 @@ This module provides settings classes for different message broker implementatio
 from typing import Union
 
 from nfa.broker.settings.base import BaseBrokerSettings
+from nfa.broker.settings.composite import CompositeBrokerSettings, ShardRoute
 from nfa.broker.settings.kafka import KafkaBrokerInstance, KafkaBrokerSettings
 from nfa.broker.settings.rabbitmq import RabbitBrokerSettings
+from nfa.broker.settings.ratelimit import RateLimitSettings
 
 # Type alias for all possible broker settings
-BrokerSettings = Union[KafkaBrokerSettings, RabbitBrokerSettings]
+BrokerSettings = Union[KafkaBrokerSettings, RabbitBrokerSettings, CompositeBrokerSettings]
 
 __all__ = [
     'BaseBrokerSettings',
     'BrokerSettings',
+    'CompositeBrokerSettings',
     'KafkaBrokerInstance',
     'KafkaBrokerSettings',
     'RabbitBrokerSettings',
+    'RateLimitSettings',
+    'ShardRoute',
 ]
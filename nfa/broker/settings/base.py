@@ -3,12 +3,22 @@ from typing import Union
 
 from pydantic import BaseModel, validator
 
+from nfa.broker.enums import ValidationMode
+
+from .ratelimit import RateLimitSettings
+
 
 class BaseBrokerSettings(BaseModel):
     """Base settings shared by all brokers"""
     log_level: str = "INFO"
     timeout_ms: int = 1000 * 10
 
+    # Validation mode recorded on published messages and used by default for subscriptions
+    validation_mode: ValidationMode = ValidationMode.full
+
+    # Optional publisher rate limits
+    rate_limit: RateLimitSettings | None = None
+
     @property
     def log_level_int(self) -> int:
         level = self.log_level.upper()
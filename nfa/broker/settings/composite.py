@@ -0,0 +1,84 @@
+from typing import Annotated, Literal, Union
+
+from pydantic import BaseModel, Field, root_validator, validator
+
+from nfa.broker.enums import BrokerType
+
+from .base import BaseBrokerSettings
+from .kafka import KafkaBrokerSettings
+from .rabbitmq import RabbitBrokerSettings
+
+# Inherited settings which only take effect in the shard settings
+SHARD_ONLY_FIELDS = ("log_level", "timeout_ms", "validation_mode", "rate_limit")
+
+ShardSettings = Annotated[Union[KafkaBrokerSettings, RabbitBrokerSettings], Field(discriminator="broker_type")]
+
+
+class ShardRoute(BaseModel):
+    """Route of the routing keys matching a pattern to one or several shards"""
+    # Shell-style pattern matched against routing keys, e.g. "orders.*"
+    pattern: str
+    # Keyed messages are consistently hashed across the shards, unkeyed ones are spread round-robin
+    shards: list[str]
+
+    @validator("shards")
+    def validate_shards(cls, v):
+        if not v:
+            raise ValueError("At least one shard must be specified")
+        return v
+
+
+class CompositeBrokerSettings(BaseBrokerSettings):
+    """
+    Settings of a broker routing messages across several brokers
+
+    Logging, timeouts, validation and rate limits are configured per shard,
+    setting them on the composite settings to another value than their default is rejected.
+    """
+    broker_type: Literal[BrokerType.composite] = BrokerType.composite
+    shards: dict[str, ShardSettings]
+
+    # Routes are matched in order, unmatched routing keys go to the default shard
+    routes: list[ShardRoute] = []
+    default_shard: str | None = None
+
+    # Points per shard on the consistent hash ring
+    virtual_nodes: int = 100
+
+    @root_validator(pre=True)
+    def validate_shard_only_fields(cls, values):
+        # Defaults are accepted so that dumped settings validate again
+        shard_only = sorted(
+            field for field in SHARD_ONLY_FIELDS
+            if field in values and values[field] != cls.model_fields[field].get_default(call_default_factory=True)
+        )
+        if shard_only:
+            raise ValueError(f"Settings {shard_only} only apply to shards, set them in the shard settings")
+        return values
+
+    @validator("shards")
+    def validate_shards(cls, v):
+        if not v:
+            raise ValueError("At least one shard must be specified")
+        return v
+
+    @validator("routes")
+    def validate_routes(cls, v, values):
+        shards = values.get("shards") or {}
+        for route in v:
+            unknown = set(route.shards) - set(shards)
+            if unknown:
+                raise ValueError(f"Route {route.pattern} references unknown shards {sorted(unknown)}")
+        return v
+
+    @validator("default_shard")
+    def validate_default_shard(cls, v, values):
+        if v is not None and v not in (values.get("shards") or {}):
+            raise ValueError(f"Unknown default shard {v}")
+        return v
+
+    @validator("virtual_nodes")
+    def validate_virtual_nodes(cls, v):
+        if v < 1:
+            raise ValueError("Virtual nodes must be positive")
+        return v
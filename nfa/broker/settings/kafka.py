@@ -1,6 +1,7 @@
+import socket
 from typing import Literal, Optional
 
-from pydantic import BaseModel, SecretStr, validator
+from pydantic import BaseModel, Field, SecretStr, validator
 
 from nfa.broker.enums import BrokerType
 
@@ -26,6 +27,11 @@ class KafkaBrokerSettings(BaseBrokerSettings):
     # Client settings
     client_id: str | None = None
     group_id: str | None = None
+
+    # Request/reply settings, the reply topic defaults to "<client_id>.<instance_id>.reply"
+    # The instance id must be stable across restarts and unique among the replicas of a client
+    reply_topic: str | None = None
+    instance_id: str = Field(default_factory=socket.gethostname)
     
     # Security settings
     security_protocol: Literal["PLAINTEXT", "SSL", "SASL_PLAINTEXT", "SASL_SSL"] = "PLAINTEXT"
@@ -67,6 +73,17 @@ class KafkaBrokerSettings(BaseBrokerSettings):
             raise ValueError("At least one Kafka broker instance must be specified")
         return v
 
+    @property
+    def reply_topic_name(self) -> str | None:
+        """Get the topic replies to the requests of this client instance are sent to"""
+        if self.reply_topic is not None:
+            return self.reply_topic
+
+        if self.client_id is not None:
+            return f"{self.client_id}.{self.instance_id}.reply"
+
+        return None
+
     @property
     def bootstrap_servers(self) -> list[str]:
         """Get the list of Kafka broker addresses for the bootstrap servers"""
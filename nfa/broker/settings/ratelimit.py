@@ -0,0 +1,61 @@
+from pydantic import BaseModel, validator
+
+
+class RateLimitSettings(BaseModel):
+    """Publisher rate limits, publishers beyond the limits wait for their turn"""
+    # Broker-wide limit
+    messages_per_sec: float | None = None
+    # Limit applied to every routing key without an explicit limit
+    routing_key_messages_per_sec: float | None = None
+    # Limits by routing key
+    routing_keys: dict[str, float] = {}
+    # Maximum number of messages sent at once, defaults to one second of messages
+    burst: int | None = None
+    # Maximum wait of a publish reserved in advance, publishers beyond it wait before reserving
+    max_wait_ms: int = 60000
+
+    # Adaptive mode lowers the rates when publish latency rises or the broker throttles
+    adaptive: bool = False
+    target_latency_ms: float = 100
+    min_messages_per_sec: float = 1.0
+    adjust_interval_ms: int = 1000
+    decrease_factor: float = 0.5
+    # Fraction of the configured rate recovered per adjust interval
+    increase_ratio: float = 0.05
+
+    @validator("messages_per_sec", "routing_key_messages_per_sec", "min_messages_per_sec")
+    def validate_rate(cls, v):
+        if v is not None and v <= 0:
+            raise ValueError("Rate must be positive")
+        return v
+
+    @validator("routing_keys")
+    def validate_routing_keys(cls, v):
+        for routing_key, rate in v.items():
+            if rate <= 0:
+                raise ValueError(f"Rate of routing key {routing_key} must be positive")
+        return v
+
+    @validator("burst")
+    def validate_burst(cls, v):
+        if v is not None and v < 1:
+            raise ValueError("Burst must be positive")
+        return v
+
+    @validator("max_wait_ms", "target_latency_ms", "adjust_interval_ms")
+    def validate_positive(cls, v):
+        if v <= 0:
+            raise ValueError("Value must be positive")
+        return v
+
+    @validator("decrease_factor")
+    def validate_decrease_factor(cls, v):
+        if not 0 < v < 1:
+            raise ValueError("Decrease factor must be between 0 and 1")
+        return v
+
+    @validator("increase_ratio")
+    def validate_increase_ratio(cls, v):
+        if v <= 0:
+            raise ValueError("Increase ratio must be positive")
+        return v
@@ -0,0 +1,126 @@
+"""
+Message validation modes.
+
+Consumed payloads are normally validated into their message type with pydantic.
+When both ends of a subscription are nfa brokers sharing the same schema, the
+publisher can mark the payload as trusted and the consumer may skip validation.
+"""
+from functools import lru_cache
+from typing import Annotated, Any, Generic
+
+from pydantic import BaseModel, TypeAdapter
+
+from nfa.broker.broker import Message
+from nfa.broker.enums import ValidationMode
+
+VALIDATION_HEADER = "x-nfa-validation"
+
+
+def resolve_validation_mode(subscription_mode: ValidationMode, header: str | None) -> ValidationMode:
+    """
+    Pick the validation mode for a single consumed message.
+
+    Args:
+        subscription_mode: The mode requested by the subscription
+        header: The mode recorded by the publisher, if any
+
+    Returns:
+        ValidationMode: The subscription mode if the publisher vouches for the payload, full validation otherwise
+    """
+    if subscription_mode is ValidationMode.full or header is None:
+        return ValidationMode.full
+
+    try:
+        publisher_mode = ValidationMode(header)
+    except ValueError:
+        return ValidationMode.full
+
+    if publisher_mode is ValidationMode.full:
+        return ValidationMode.full
+
+    return subscription_mode
+
+
+def build_message(message_type: type[Message], body: Any, mode: ValidationMode) -> "Message | LazyMessage[Message]":
+    """
+    Build a message of the given type from a decoded payload.
+
+    Args:
+        message_type: The message type to build
+        body: The decoded payload
+        mode: How the payload should be turned into the message type
+
+    Returns:
+        The validated message, an unvalidated message or a lazy proxy depending on 'mode'
+
+    Note:
+        Payloads that were not decoded into a mapping are always fully validated.
+    """
+    if isinstance(body, (bytes, str)):
+        return message_type.model_validate_json(body)
+
+    if mode is ValidationMode.full or not isinstance(body, dict):
+        return message_type.model_validate(body)
+
+    if mode is ValidationMode.trusted:
+        return message_type.model_construct(**body)
+
+    return LazyMessage(message_type, body)
+
+
+@lru_cache(maxsize=None)
+def _field_adapter(model_type: type[BaseModel], name: str) -> TypeAdapter:
+    """Build and cache the type adapter validating a single model field"""
+    field = model_type.model_fields[name]
+    if field.metadata:
+        return TypeAdapter(Annotated[(field.annotation, *field.metadata)])
+
+    return TypeAdapter(field.annotation)
+
+
+class LazyMessage(Generic[Message]):
+    """
+    Read-only proxy validating the fields of a message only when they are accessed.
+
+    Validated fields are cached, so each field is validated at most once.
+    Use `model()` to get the fully validated message.
+    """
+    __slots__ = ("_model_type", "_data", "_fields")
+
+    def __init__(self, model_type: type[Message], data: dict[str, Any]):
+        self._model_type = model_type
+        self._data = data
+        self._fields: dict[str, Any] = {}
+
+    @property
+    def model_type(self) -> type[Message]:
+        """The message type this proxy stands for"""
+        return self._model_type
+
+    def model(self) -> Message:
+        """Validate the whole payload into its message type"""
+        return self._model_type.model_validate(self._data)
+
+    def __getattr__(self, name: str) -> Any:
+        fields = self._fields
+        if name in fields:
+            return fields[name]
+
+        field = self._model_type.model_fields.get(name)
+        if field is None:
+            raise AttributeError(f"{self._model_type.__name__} has no field {name}")
+
+        if field.alias is not None and field.alias in self._data:
+            value = _field_adapter(self._model_type, name).validate_python(self._data[field.alias])
+        elif name in self._data:
+            value = _field_adapter(self._model_type, name).validate_python(self._data[name])
+        elif not field.is_required():
+            value = field.get_default(call_default_factory=True)
+        else:
+            raise ValueError(f"Field {name} is missing from {self._model_type.__name__} message")
+
+        fields[name] = value
+        return value
+
+    def __repr__(self) -> str:
+        return f"LazyMessage[{self._model_type.__name__}]({self._data!r})"
@@ -0,0 +1,74 @@
+import pytest
+
+from nfa.broker.capture import MAGIC, CaptureRecord, CaptureWriter, read_capture
+from nfa.broker.enums import CaptureDirection
+
+RECORDS = [
+    CaptureRecord(1700000000.5, CaptureDirection.published, "orders", {"x-nfa-validation": "full"}, b'{"id":1}'),
+    CaptureRecord(1700000001.25, CaptureDirection.consumed, "orders", {}, b""),
+    CaptureRecord(1700000002.0, CaptureDirection.published, "payments.é", {"a": "b"}, bytes(range(256)) * 100),
+]
+
+
+def _write(path, compress=False):
+    with CaptureWriter(path, compress=compress) as writer:
+        for record in RECORDS:
+            writer.write(record)
+    return writer
+
+
+def test_round_trip(tmp_path):
+    path = tmp_path / "traffic.cap"
+    writer = _write(path)
+    assert writer.records == len(RECORDS)
+    assert list(read_capture(path)) == RECORDS
+
+
+def test_round_trip_zstd(tmp_path):
+    pytest.importorskip("zstandard")
+    path = tmp_path / "traffic.cap.zst"
+    _write(path, compress=True)
+    assert not path.read_bytes().startswith(MAGIC)
+    assert list(read_capture(path)) == RECORDS
+
+
+def test_compression_shrinks_file(tmp_path):
+    pytest.importorskip("zstandard")
+    _write(tmp_path / "plain.cap")
+    _write(tmp_path / "compressed.cap", compress=True)
+    assert (tmp_path / "compressed.cap").stat().st_size < (tmp_path / "plain.cap").stat().st_size
+
+
+def test_empty_capture(tmp_path):
+    path = tmp_path / "empty.cap"
+    CaptureWriter(path).close()
+    assert list(read_capture(path)) == []
+
+
+def test_not_a_capture_file(tmp_path):
+    path = tmp_path / "other.bin"
+    path.write_bytes(b"not a capture")
+    with pytest.raises(ValueError, match="not a capture file"):
+        list(read_capture(path))
+
+
+@pytest.mark.parametrize("cut", [2, 10, 100])
+def test_truncated_capture(tmp_path, cut):
+    path = tmp_path / "traffic.cap"
+    _write(path)
+    path.write_bytes(path.read_bytes()[:-cut])
+
+    records = read_capture(path)
+    assert next(records) == RECORDS[0]
+    with pytest.raises(ValueError, match="Truncated"):
+        list(records)
+
+
+def test_truncated_compressed_capture(tmp_path):
+    pytest.importorskip("zstandard")
+    path = tmp_path / "traffic.cap.zst"
+    _write(path, compress=True)
+    path.write_bytes(path.read_bytes()[:-20])
+
+    with pytest.raises(ValueError, match="Truncated"):
+        list(read_capture(path))
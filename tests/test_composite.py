@@ -0,0 +1,230 @@
+import asyncio
+from collections import Counter
+from typing import ClassVar
+
+import pytest
+from pydantic import BaseModel, ValidationError
+
+from nfa.broker import Broker
+from nfa.broker.composite import CompositeBroker, HashRing, _ShardSet, get_shard_key
+from nfa.broker.monitoring import PartitionLag, QueueDepth
+from nfa.broker.settings import CompositeBrokerSettings
+
+SHARDS = {
+    "east": {"broker_type": "faststream.kafka", "instances": [{"host": "east"}]},
+    "west": {"broker_type": "faststream.rabbit", "host": "west", "port": 5672},
+}
+
+
+def test_hash_ring_is_deterministic():
+    ring = HashRing(["a", "b", "c"])
+    other = HashRing(["c", "a", "b"])
+    assert [ring.node(str(key)) for key in range(100)] == [other.node(str(key)) for key in range(100)]
+
+
+def test_hash_ring_spreads_keys():
+    ring = HashRing(["a", "b", "c"])
+    counts = Counter(ring.node(str(key)) for key in range(3000))
+    assert set(counts) == {"a", "b", "c"}
+    assert min(counts.values()) > 500
+
+
+def test_hash_ring_moves_few_keys_when_adding_a_node():
+    before = HashRing(["a", "b", "c"])
+    after = HashRing(["a", "b", "c", "d"])
+    moved = [key for key in map(str, range(3000)) if before.node(key) != after.node(key)]
+    assert all(after.node(key) == "d" for key in moved)
+    assert len(moved) < 1500
+
+
+def test_hash_ring_requires_nodes():
+    with pytest.raises(ValueError):
+        HashRing([])
+
+
+def test_shard_set_single_shard():
+    shard_set = _ShardSet(["a"], 10)
+    assert {shard_set.select(None), shard_set.select("key")} == {"a"}
+
+
+def test_shard_set_hashes_keyed_messages():
+    shard_set = _ShardSet(["a", "b"], 10)
+    assert len({shard_set.select("key") for _ in range(10)}) == 1
+
+
+def test_shard_set_round_robins_unkeyed_messages():
+    shard_set = _ShardSet(["a", "b"], 10)
+    assert [shard_set.select(None) for _ in range(4)] == ["a", "b", "a", "b"]
+
+
+def test_get_shard_key():
+    class Attribute:
+        shard_key = "a"
+
+    class Method:
+        def shard_key(self):
+            return "b"
+
+    class Invalid:
+        shard_key = 1
+
+    assert get_shard_key(Attribute()) == "a"
+    assert get_shard_key(Method()) == "b"
+    assert get_shard_key(object()) is None
+    with pytest.raises(ValueError):
+        get_shard_key(Invalid())
+
+
+def test_settings_validate_shard_references():
+    settings = CompositeBrokerSettings(shards=SHARDS, routes=[{"pattern": "orders.*", "shards": ["east", "west"]}])
+    assert settings.routes[0].shards == ["east", "west"]
+
+    with pytest.raises(ValidationError):
+        CompositeBrokerSettings(shards=SHARDS, routes=[{"pattern": "*", "shards": ["north"]}])
+    with pytest.raises(ValidationError):
+        CompositeBrokerSettings(shards=SHARDS, default_shard="north")
+
+
+@pytest.mark.parametrize("field", ["validation_mode", "timeout_ms", "log_level", "rate_limit"])
+def test_settings_reject_shard_only_fields(field):
+    values = {"validation_mode": "trusted", "timeout_ms": 1000, "log_level": "DEBUG", "rate_limit": {"messages_per_sec": 1}}
+    with pytest.raises(ValidationError, match="only apply to shards"):
+        CompositeBrokerSettings(shards=SHARDS, **{field: values[field]})
+
+
+def test_settings_round_trip():
+    settings = CompositeBrokerSettings(
+        shards=SHARDS,
+        routes=[{"pattern": "orders.*", "shards": ["east", "west"]}],
+        default_shard="east",
+    )
+    assert CompositeBrokerSettings.model_validate(settings.model_dump()) == settings
+    assert CompositeBrokerSettings.model_validate_json(settings.model_dump_json()) == settings
+
+
+def test_settings_accept_default_shard_only_fields():
+    settings = CompositeBrokerSettings(shards=SHARDS, validation_mode="full", timeout_ms=10000, log_level="INFO", rate_limit=None)
+    assert settings.validation_mode == "full"
+
+
+class Order(BaseModel):
+    routing_key: ClassVar[str] = "orders.created"
+    customer: str
+
+    def shard_key(self) -> str:
+        return self.customer
+
+
+class Audit(BaseModel):
+    routing_key: ClassVar[str] = "audit"
+
+
+class FakeShard(Broker):
+    """Shard broker recording its calls"""
+
+    def __init__(self, fail_open: bool = False, lags: list[PartitionLag] | None = None, depths: list[QueueDepth] | None = None):
+        super().__init__(None)
+        self.fail_open = fail_open
+        self.lags = lags
+        self.depths = depths
+        self.warmup = None
+        self.published = []
+        self.subscribed = []
+
+    async def open(self, warmup=None):
+        if self.fail_open:
+            raise ConnectionError("unreachable")
+        self.warmup = warmup
+        self._is_running = True
+
+    async def close(self):
+        self._is_running = False
+
+    async def subscribe(self, subscriber, message_type, timeout_sec=None, validation=None, retry=None):
+        self.subscribed.append(message_type)
+
+    async def publish(self, message):
+        self.published.append(message)
+
+    async def _start(self):
+        pass
+
+    async def lag(self):
+        if self.lags is None:
+            raise NotImplementedError
+        return self.lags
+
+    async def queue_depth(self):
+        if self.depths is None:
+            raise NotImplementedError
+        return self.depths
+
+
+def _composite(**shards: FakeShard) -> CompositeBroker:
+    settings = CompositeBrokerSettings(
+        shards=SHARDS,
+        routes=[{"pattern": "orders.*", "shards": ["east", "west"]}],
+        default_shard="east",
+    )
+    return CompositeBroker(settings, {"east": FakeShard(), "west": FakeShard(), **shards})
+
+
+def test_composite_open_warms_up_routed_shards():
+    broker = _composite()
+    asyncio.run(broker.open(warmup=[Order, Audit]))
+
+    assert broker.is_running
+    assert broker.shards["east"].warmup == [Order, Audit]
+    assert broker.shards["west"].warmup == [Order]
+
+
+def test_composite_open_closes_connected_shards_on_failure():
+    broker = _composite(west=FakeShard(fail_open=True))
+    with pytest.raises(ConnectionError):
+        asyncio.run(broker.open())
+
+    assert not broker.is_running
+    assert not broker.shards["east"].is_running
+
+
+def test_composite_routes_publishes():
+    broker = _composite()
+
+    async def run():
+        await broker.open()
+        for customer in ("a", "b", "a", "c", "d"):
+            await broker.publish(Order(customer=customer))
+        await broker.publish(Audit())
+
+    asyncio.run(run())
+    east, west = broker.shards["east"], broker.shards["west"]
+    assert Audit() in east.published and Audit() not in west.published
+    assert len(east.published) + len(west.published) == 6
+    for customer in ("a", "b", "c", "d"):
+        owners = [shard for shard in (east, west) if Order(customer=customer) in shard.published]
+        assert len(owners) == 1
+
+
+def test_composite_subscribes_every_routed_shard():
+    broker = _composite()
+
+    async def handler(message: Order) -> None:
+        pass
+
+    asyncio.run(broker.subscribe(handler, Order))
+    assert broker.shards["east"].subscribed == [Order]
+    assert broker.shards["west"].subscribed == [Order]
+
+
+def test_composite_tags_lag_and_depth_with_their_shard():
+    lag = PartitionLag(topic="orders.created", partition=0, committed=1, end_offset=3, lag=2)
+    depth = QueueDepth(queue="audit", messages=4)
+    broker = _composite(east=FakeShard(lags=[lag], depths=[depth]))
+
+    assert asyncio.run(broker.lag()) == [lag.model_copy(update={"broker": "east"})]
+    assert asyncio.run(broker.queue_depth()) == [depth.model_copy(update={"broker": "east"})]
+
+
+def test_composite_without_monitored_shard():
+    with pytest.raises(NotImplementedError):
+        asyncio.run(_composite().lag())
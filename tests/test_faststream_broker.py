@@ -0,0 +1,342 @@
+import asyncio
+import time
+from types import SimpleNamespace
+from typing import Any, ClassVar
+
+import pytest
+from pydantic import BaseModel, ValidationError
+
+pytest.importorskip("faststream")
+
+from faststream.exceptions import AckMessage
+
+from nfa.broker.adapters.faststream.faststream_broker import FaststreamBroker
+from nfa.broker.retry import (
+    ATTEMPT_HEADER,
+    ERROR_MESSAGE_HEADER,
+    ERROR_TYPE_HEADER,
+    FAILED_AT_HEADER,
+    ORIGIN_HEADER,
+    RETRY_AT_HEADER,
+    RetryPolicy,
+)
+from nfa.broker.settings import KafkaBrokerSettings
+
+
+class Ping(BaseModel):
+    routing_key: ClassVar[str] = "ping"
+    value: int
+
+
+class Pong(BaseModel):
+    routing_key: ClassVar[str] = "pong"
+    value: int
+
+
+class StubSubscriber:
+    def __init__(self):
+        self.handler = None
+        self.started = False
+
+    def __call__(self, handler):
+        self.handler = handler
+        return handler
+
+    async def start(self):
+        self.started = True
+
+
+class StubFaststream:
+    def __init__(self, ping=True):
+        self.closed = False
+        self.subscribers = []
+        self.ping_result = ping
+        self.ping_timeouts = []
+
+    async def connect(self):
+        pass
+
+    async def start(self):
+        pass
+
+    async def close(self):
+        self.closed = True
+
+    def setup_subscriber(self, subscriber):
+        self.subscribers.append(subscriber)
+
+    async def ping(self, timeout):
+        self.ping_timeouts.append(timeout)
+        if isinstance(self.ping_result, Exception):
+            raise self.ping_result
+        return self.ping_result
+
+
+class FakeBroker(FaststreamBroker[KafkaBrokerSettings]):
+    """FastStream broker publishing to an in-process responder"""
+
+    def __init__(self, responder=None, ping=True, warmup_error: Exception | None = None, **settings: Any):
+        super().__init__(KafkaBrokerSettings(instances=[{"host": "localhost"}], **settings))
+        self.responder = responder
+        self.ping = ping
+        self.warmup_error = warmup_error
+        self.warmed_up = []
+        self.connections: list[StubFaststream] = []
+        self.retried: list[tuple[int, dict]] = []
+        self.dead_letters: list[dict] = []
+        self.published: list[tuple[BaseModel, dict]] = []
+        self.reply_subscriber = StubSubscriber()
+
+    def _create_broker(self):
+        self.connections.append(StubFaststream(self.ping))
+        return self.connections[-1]
+
+    async def _publish(self, message, routing_key, **options):
+        self.published.append((message, options))
+        if self.responder is not None:
+            await self.responder(message, options)
+
+    async def subscribe(self, subscriber, message_type, timeout_sec=None, validation=None, retry=None):
+        pass
+
+    async def _warmup(self, message_types):
+        if self.warmup_error is not None:
+            raise self.warmup_error
+        self.warmed_up.extend(message_types)
+
+    def _create_reply_subscriber(self):
+        return self.reply_subscriber, "replies"
+
+    async def _publish_retry(self, routing_key, attempt, message, headers):
+        self.retried.append((attempt, headers))
+
+    async def _publish_dead_letter(self, routing_key, message, headers):
+        self.dead_letters.append(headers)
+
+    async def reply(self, correlation_id: str, body: Any) -> None:
+        await self.reply_subscriber.handler(body, message=SimpleNamespace(correlation_id=correlation_id))
+
+
+async def _started(broker: FakeBroker) -> FakeBroker:
+    await broker.open()
+    await broker.start()
+    return broker
+
+
+def test_request_returns_the_reply():
+    async def run():
+        async def respond(message, options):
+            asyncio.get_running_loop().call_soon(
+                asyncio.ensure_future, broker.reply(options["correlation_id"], {"value": message.value + 1})
+            )
+
+        broker = await _started(FakeBroker(respond))
+        reply = await broker.request(Ping(value=1), Pong, timeout_sec=1)
+
+        assert reply == Pong(value=2)
+        assert broker.published[0][1]["reply_to"] == "replies"
+        assert broker._pending_replies == {}
+
+    asyncio.run(run())
+
+
+def test_request_consumes_replies_once():
+    async def run():
+        async def respond(message, options):
+            await broker.reply(options["correlation_id"], {"value": message.value})
+
+        broker = await _started(FakeBroker(respond))
+        replies = await asyncio.gather(*(broker.request(Ping(value=i), Pong, timeout_sec=1) for i in range(3)))
+
+        assert [reply.value for reply in replies] == [0, 1, 2]
+        assert broker._broker.subscribers == [broker.reply_subscriber]
+        assert broker.reply_subscriber.started
+
+    asyncio.run(run())
+
+
+def test_request_drops_unknown_replies():
+    async def run():
+        broker = await _started(FakeBroker())
+        await broker._reply_destination()
+        await broker.reply("unknown", {"value": 1})
+        assert broker._pending_replies == {}
+
+    asyncio.run(run())
+
+
+def test_request_validates_the_reply():
+    async def run():
+        async def respond(message, options):
+            await broker.reply(options["correlation_id"], {})
+
+        broker = await _started(FakeBroker(respond))
+        with pytest.raises(ValidationError):
+            await broker.request(Ping(value=1), Pong, timeout_sec=1)
+
+    asyncio.run(run())
+
+
+def test_request_times_out_and_forgets_the_request():
+    async def run():
+        broker = await _started(FakeBroker())
+        with pytest.raises(TimeoutError):
+            await broker.request(Ping(value=1), Pong, timeout_sec=0.05)
+        assert broker._pending_replies == {}
+
+    asyncio.run(run())
+
+
+def test_request_timeout_covers_the_publish():
+    async def run():
+        async def respond(message, options):
+            await asyncio.sleep(0.5)
+
+        broker = await _started(FakeBroker(respond))
+        started = time.perf_counter()
+        with pytest.raises(TimeoutError):
+            await broker.request(Ping(value=1), Pong, timeout_sec=0.05)
+        assert time.perf_counter() - started < 0.3
+
+    asyncio.run(run())
+
+
+def test_request_requires_consumption():
+    async def run():
+        broker = FakeBroker()
+        await broker.open()
+        with pytest.raises(RuntimeError):
+            await broker.request(Ping(value=1), Pong, timeout_sec=1)
+
+    asyncio.run(run())
+
+
+def test_close_fails_pending_requests():
+    async def run():
+        broker = await _started(FakeBroker())
+        request = asyncio.create_task(broker.request(Ping(value=1), Pong, timeout_sec=1))
+        await asyncio.sleep(0.01)
+        await broker.close()
+
+        with pytest.raises(ConnectionError):
+            await request
+        assert broker._pending_replies == {}
+        assert broker._reply_to is None
+
+    asyncio.run(run())
+
+
+def test_health_requires_open_and_warm_broker():
+    async def run():
+        broker = FakeBroker()
+        assert not await broker.health()
+        await broker.open(warmup=[Ping])
+        assert broker.warmed_up == [Ping]
+        assert await broker.health()
+        await broker.close()
+        assert not await broker.health()
+
+    asyncio.run(run())
+
+
+def test_health_is_false_when_ping_fails():
+    async def run():
+        for ping in (False, ConnectionError("unreachable")):
+            broker = FakeBroker(ping=ping)
+            await broker.open()
+            assert not await broker.health()
+
+    asyncio.run(run())
+
+
+def test_health_ping_timeout_defaults_to_settings():
+    async def run():
+        broker = FakeBroker(timeout_ms=2500)
+        await broker.open()
+        await broker.health()
+        await broker.health(timeout_sec=0.5)
+        assert broker._broker.ping_timeouts == [2.5, 0.5]
+
+    asyncio.run(run())
+
+
+def test_warmup_failure_closes_the_connection():
+    async def run():
+        broker = FakeBroker(warmup_error=LookupError("unknown topic"))
+        with pytest.raises(ConnectionError, match="warm up"):
+            await broker.open(warmup=[Ping])
+
+        assert broker.connections[0].closed
+        assert not broker.is_running
+        assert broker._broker is None
+        assert not await broker.health()
+
+        # The next open connects and warms up again
+        broker.warmup_error = None
+        await broker.open(warmup=[Ping])
+        assert broker.is_running
+        assert await broker.health()
+
+    asyncio.run(run())
+
+
+async def _fail(broker: FakeBroker, retry: RetryPolicy, headers: dict[str, str]) -> None:
+    message = SimpleNamespace(headers={"x-custom": "kept", **headers})
+    await broker._handle_failure("ping", message, retry, ValueError("boom"))
+
+
+def test_failure_is_retried_with_the_next_attempt():
+    broker = FakeBroker()
+    retry = RetryPolicy(max_attempts=3, backoff_ms=1000, backoff_multiplier=2)
+
+    async def run():
+        await _fail(broker, retry, {})
+        await _fail(broker, retry, broker.retried[-1][1])
+
+    now_ms = time.time() * 1000
+    asyncio.run(run())
+
+    assert [attempt for attempt, _ in broker.retried] == [1, 2]
+    first, second = (headers for _, headers in broker.retried)
+    assert (first[ATTEMPT_HEADER], second[ATTEMPT_HEADER]) == ("2", "3")
+    assert int(first[RETRY_AT_HEADER]) - now_ms == pytest.approx(1000, abs=200)
+    assert int(second[RETRY_AT_HEADER]) - now_ms == pytest.approx(2000, abs=200)
+    assert first[ORIGIN_HEADER] == "ping" and first["x-custom"] == "kept"
+    assert broker.dead_letters == []
+
+
+def test_failure_of_the_last_attempt_is_dead_lettered():
+    broker = FakeBroker()
+    asyncio.run(_fail(broker, RetryPolicy(max_attempts=3), {ATTEMPT_HEADER: "3", RETRY_AT_HEADER: "0"}))
+
+    assert broker.retried == []
+    [headers] = broker.dead_letters
+    assert headers[ATTEMPT_HEADER] == "3"
+    assert headers[ORIGIN_HEADER] == "ping"
+    assert (headers[ERROR_TYPE_HEADER], headers[ERROR_MESSAGE_HEADER]) == ("ValueError", "boom")
+    assert int(headers[FAILED_AT_HEADER]) == pytest.approx(time.time() * 1000, abs=1000)
+    assert headers["x-custom"] == "kept"
+
+
+def test_failure_of_the_last_attempt_is_dropped_without_dead_letter():
+    broker = FakeBroker()
+    asyncio.run(_fail(broker, RetryPolicy(max_attempts=1, dead_letter=False), {}))
+
+    assert broker.retried == []
+    assert broker.dead_letters == []
+
+
+def test_wrapped_subscriber_acknowledges_retried_failures():
+    async def on_ping(message: Ping) -> None:
+        raise ValueError("boom")
+
+    broker = FakeBroker()
+    message = SimpleNamespace(headers={}, body=b"{}")
+    retried = broker._wrap_subscriber(on_ping, Ping, "ping", retry=RetryPolicy())
+    unretried = broker._wrap_subscriber(on_ping, Ping, "ping")
+
+    with pytest.raises(AckMessage):
+        asyncio.run(retried({"value": 1}, message=message))
+    with pytest.raises(ValueError):
+        asyncio.run(unretried({"value": 1}, message=message))
+    assert [attempt for attempt, _ in broker.retried] == [1]
@@ -0,0 +1,184 @@
+import asyncio
+from typing import ClassVar
+
+import pytest
+from pydantic import BaseModel
+
+pytest.importorskip("faststream.kafka")
+
+from aiokafka import TopicPartition
+from faststream import Context
+from faststream.kafka import TestKafkaBroker
+
+from nfa.broker.adapters.faststream.kafka_broker import KafkaBroker
+from nfa.broker.retry import RetryPolicy
+from nfa.broker.settings import KafkaBrokerSettings
+
+
+class Ping(BaseModel):
+    routing_key: ClassVar[str] = "ping"
+    value: int
+
+
+class Pong(BaseModel):
+    routing_key: ClassVar[str] = "pong"
+    value: int
+
+
+def _broker(**settings) -> KafkaBroker:
+    broker = KafkaBroker(KafkaBrokerSettings(instances=[{"host": "localhost"}], **settings))
+    broker._broker = broker._create_broker()
+    return broker
+
+
+async def _request_replies(failures: int, retry: RetryPolicy) -> tuple[list, list]:
+    """Publish a request to a failing subscriber and collect its replies and dead letters"""
+    broker = _broker()
+    calls = []
+    replies = []
+    dead_letters = []
+
+    async def on_ping(message: Ping) -> Pong:
+        calls.append(message)
+        if len(calls) <= failures:
+            raise ValueError("boom")
+        return Pong(value=message.value + 1)
+
+    await broker.subscribe(on_ping, Ping, retry=retry)
+    @broker._broker.subscriber("replies")
+    async def on_reply(body: dict) -> None:
+        replies.append(body)
+
+    # Dead letters keep the requester of their message, their consumer must not reply to it
+    @broker._broker.subscriber("ping.dlq", no_reply=True)
+    async def on_dead_letter(body: dict, message=Context()) -> None:
+        dead_letters.append((body, message.reply_to))
+
+    async with TestKafkaBroker(broker._broker) as test_broker:
+        await test_broker.publish({"value": 1}, topic="ping", reply_to="replies", correlation_id="request")
+
+    return replies, dead_letters
+
+
+def test_retried_request_replies_once():
+    replies, dead_letters = asyncio.run(_request_replies(1, RetryPolicy(max_attempts=2, backoff_ms=1)))
+    assert replies == [{"value": 2}]
+    assert dead_letters == []
+
+
+def test_failed_request_does_not_reply():
+    replies, dead_letters = asyncio.run(_request_replies(1, RetryPolicy(max_attempts=1)))
+    assert replies == []
+    assert dead_letters == [({"value": 1}, "replies")]
+
+
+def test_reply_topic_is_per_instance():
+    assert KafkaBrokerSettings(instances=[{"host": "localhost"}], client_id="svc", instance_id="0").reply_topic_name == "svc.0.reply"
+    assert KafkaBrokerSettings(instances=[{"host": "localhost"}], client_id="svc").reply_topic_name.startswith("svc.")
+    assert KafkaBrokerSettings(instances=[{"host": "localhost"}], reply_topic="replies").reply_topic_name == "replies"
+    assert KafkaBrokerSettings(instances=[{"host": "localhost"}]).reply_topic_name is None
+
+
+class FakeReplyConsumer:
+    def __init__(self, partitions: set[TopicPartition], assigned_after: int):
+        self._partitions = partitions
+        self._polls = assigned_after
+        self.seeked: tuple = ()
+        self.positions: list[TopicPartition] = []
+
+    def assignment(self) -> set[TopicPartition]:
+        self._polls -= 1
+        return self._partitions if self._polls < 0 else set()
+
+    async def seek_to_end(self, *partitions: TopicPartition) -> None:
+        self.seeked = partitions
+
+    async def position(self, partition: TopicPartition) -> int:
+        self.positions.append(partition)
+        return 0
+
+
+def test_reply_subscriber_waits_for_its_end_offsets():
+    partitions = {TopicPartition("replies", 0), TopicPartition("replies", 1)}
+    consumer = FakeReplyConsumer(partitions, assigned_after=2)
+    subscriber = type("Subscriber", (), {"consumer": consumer})()
+
+    asyncio.run(_broker()._ready_reply_subscriber(subscriber))
+
+    assert set(consumer.seeked) == partitions
+    assert set(consumer.positions) == partitions
+
+
+def test_reply_subscriber_times_out_without_assignment():
+    consumer = FakeReplyConsumer(set(), assigned_after=0)
+    subscriber = type("Subscriber", (), {"consumer": consumer})()
+
+    with pytest.raises(TimeoutError):
+        asyncio.run(_broker(timeout_ms=100)._ready_reply_subscriber(subscriber))
+
+
+class FakeLagConsumer:
+    def __init__(self, end_offsets: dict[TopicPartition, int], committed: dict[TopicPartition, int | None], positions: dict[TopicPartition, int]):
+        self._end_offsets = end_offsets
+        self._committed = committed
+        self._positions = positions
+
+    def assignment(self) -> set[TopicPartition]:
+        return set(self._end_offsets)
+
+    async def end_offsets(self, partitions: list[TopicPartition]) -> dict[TopicPartition, int]:
+        return {partition: self._end_offsets[partition] for partition in partitions}
+
+    async def committed(self, partition: TopicPartition) -> int | None:
+        return self._committed[partition]
+
+    async def position(self, partition: TopicPartition) -> int:
+        return self._positions[partition]
+
+
+def _lag_broker(consumer: FakeLagConsumer | None, **settings) -> KafkaBroker:
+    broker = _broker(**settings)
+    broker._subscribers.append(type("Subscriber", (), {"consumer": consumer})())
+    broker._subscribers.append(type("Subscriber", (), {"consumer": None})())
+    return broker
+
+
+def test_lag_from_committed_offsets():
+    first, second = TopicPartition("ping", 0), TopicPartition("ping", 1)
+    consumer = FakeLagConsumer({first: 10, second: 5}, {first: 4, second: None}, {first: 8, second: 2})
+
+    lags = sorted(asyncio.run(_lag_broker(consumer, group_id="group").lag()), key=lambda lag: lag.partition)
+
+    assert [(lag.partition, lag.committed, lag.end_offset, lag.lag) for lag in lags] == [(0, 4, 10, 6), (1, None, 5, 3)]
+
+
+def test_lag_from_positions_without_group():
+    partition = TopicPartition("ping", 0)
+    consumer = FakeLagConsumer({partition: 10}, {partition: 4}, {partition: 7})
+
+    [lag] = asyncio.run(_lag_broker(consumer).lag())
+
+    assert (lag.committed, lag.lag) == (None, 3)
+
+
+def test_lag_is_never_negative():
+    partition = TopicPartition("ping", 0)
+    consumer = FakeLagConsumer({partition: 10}, {partition: 12}, {partition: 12})
+
+    [lag] = asyncio.run(_lag_broker(consumer, group_id="group").lag())
+
+    assert lag.lag == 0
+
+
+def test_queue_depth_sums_partition_lags():
+    first, second, other = TopicPartition("ping", 0), TopicPartition("ping", 1), TopicPartition("pong", 0)
+    consumer = FakeLagConsumer({first: 10, second: 5, other: 1}, {}, {first: 8, second: 2, other: 1})
+
+    depths = asyncio.run(_lag_broker(consumer).queue_depth())
+
+    assert sorted((depth.queue, depth.messages) for depth in depths) == [("ping", 5), ("pong", 0)]
+
+
+def test_warmup_requires_the_faststream_producer():
+    with pytest.raises(RuntimeError, match="producer"):
+        asyncio.run(_broker()._warmup([Ping]))
@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+
+from nfa.broker.monitoring import LagSample, LagSampler, PartitionLag, QueueDepth
+
+LAG = PartitionLag(topic="orders", partition=0, committed=1, end_offset=3, lag=2)
+DEPTH = QueueDepth(queue="orders", messages=2)
+
+
+class FakeBroker:
+    def __init__(self, lag: bool = True, depth: bool = True):
+        self._lag = lag
+        self._depth = depth
+
+    async def lag(self):
+        if not self._lag:
+            raise NotImplementedError
+        return [LAG]
+
+    async def queue_depth(self):
+        if not self._depth:
+            raise NotImplementedError
+        return [DEPTH]
+
+
+def test_sample():
+    sample = asyncio.run(LagSampler(FakeBroker(), None).sample())
+    assert (sample.partitions, sample.queues) == ([LAG], [DEPTH])
+
+
+def test_sample_without_metrics():
+    sample = asyncio.run(LagSampler(FakeBroker(lag=False, depth=False), None).sample())
+    assert (sample.partitions, sample.queues) == ([], [])
+
+
+def test_sampler_runs_until_stopped():
+    samples: list[LagSample] = []
+
+    async def sink(sample: LagSample) -> None:
+        samples.append(sample)
+
+    async def run():
+        sampler = LagSampler(FakeBroker(depth=False), sink, interval_sec=0.01)
+        sampler.start()
+        assert sampler.is_running
+        await asyncio.sleep(0.05)
+        await sampler.stop()
+        assert not sampler.is_running
+
+        count = len(samples)
+        await asyncio.sleep(0.03)
+        assert len(samples) == count
+
+    asyncio.run(run())
+    assert len(samples) >= 2
+    assert all(sample.partitions == [LAG] and sample.queues == [] for sample in samples)
+
+
+def test_sampler_survives_sink_errors():
+    calls = 0
+
+    async def sink(sample: LagSample) -> None:
+        nonlocal calls
+        calls += 1
+        raise RuntimeError("sink down")
+
+    async def run():
+        sampler = LagSampler(FakeBroker(), sink, interval_sec=0.01)
+        sampler.start()
+        await asyncio.sleep(0.05)
+        assert sampler.is_running
+        await sampler.stop()
+
+    asyncio.run(run())
+    assert calls >= 2
+
+
+def test_sampler_rejects_non_positive_interval():
+    with pytest.raises(ValueError):
+        LagSampler(FakeBroker(), None, interval_sec=0)
@@ -0,0 +1,87 @@
+import asyncio
+from types import SimpleNamespace
+from typing import ClassVar
+
+import pytest
+from pydantic import BaseModel
+
+pytest.importorskip("faststream.rabbit")
+
+from faststream.rabbit import RabbitQueue
+
+from nfa.broker.adapters.faststream.rabbit_broker import RabbitBroker
+from nfa.broker.settings import RabbitBrokerSettings
+
+
+class Ping(BaseModel):
+    routing_key: ClassVar[str] = "ping"
+    value: int
+
+
+class Pong(BaseModel):
+    routing_key: ClassVar[str] = "pong"
+    value: int
+
+
+class RecordingFaststream:
+    def __init__(self):
+        self.published: list[dict] = []
+
+    async def publish(self, **kwargs) -> None:
+        self.published.append(kwargs)
+
+
+def _broker() -> RabbitBroker:
+    broker = RabbitBroker(RabbitBrokerSettings(host="localhost", port=5672))
+    broker._broker = RecordingFaststream()
+    return broker
+
+
+def test_request_without_subscribed_queue_fails_fast():
+    broker = _broker()
+    with pytest.raises(RuntimeError, match="No queues subscribed"):
+        asyncio.run(broker.request(Ping(value=1), Pong, timeout_sec=10))
+    assert broker._broker.published == []
+
+
+def test_retry_and_dead_letter_keep_the_requester():
+    broker = _broker()
+    message = SimpleNamespace(body=b"{}", content_type="application/json", correlation_id="request", reply_to="replies")
+
+    async def run():
+        await broker._publish_retry("ping", 1, message, {})
+        await broker._publish_dead_letter("ping", message, {})
+
+    asyncio.run(run())
+    assert [published["queue"] for published in broker._broker.published] == ["ping.retry.1", "ping.dlq"]
+    assert all(published["reply_to"] == "replies" for published in broker._broker.published)
+    assert all(published["correlation_id"] == "request" for published in broker._broker.published)
+
+
+class DeclaredQueue:
+    def __init__(self, messages: int, consumers: int):
+        self._result = SimpleNamespace(message_count=messages, consumer_count=consumers)
+
+    async def declare(self):
+        return self._result
+
+
+class DeclaringFaststream:
+    def __init__(self):
+        self.declared = []
+
+    async def declare_queue(self, queue):
+        self.declared.append(queue)
+        return DeclaredQueue(messages=len(queue.name), consumers=1)
+
+
+def test_queue_depth_declares_queues_passively(recwarn):
+    broker = _broker()
+    broker._broker = DeclaringFaststream()
+    broker._message_type_to_queues[Ping] = {RabbitQueue("ping"), RabbitQueue("pong.ping")}
+
+    depths = asyncio.run(broker.queue_depth())
+
+    assert [(depth.queue, depth.messages, depth.consumers) for depth in depths] == [("ping", 4, 1), ("pong.ping", 9, 1)]
+    assert all(not queue.declare for queue in broker._broker.declared)
+    assert not [warning for warning in recwarn if issubclass(warning.category, DeprecationWarning)]
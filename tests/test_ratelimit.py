@@ -0,0 +1,161 @@
+import asyncio
+import time
+
+import pytest
+
+from nfa.broker.ratelimit import AdaptiveTokenBucket, PublishLimiter, TokenBucket
+from nfa.broker.settings import RateLimitSettings
+
+
+async def _cancel_waiters(acquire, count: int) -> None:
+    waiters = [asyncio.create_task(acquire()) for _ in range(count)]
+    await asyncio.sleep(0)
+    for waiter in waiters:
+        waiter.cancel()
+    await asyncio.gather(*waiters, return_exceptions=True)
+
+
+def test_bucket_allows_burst_then_spaces_tokens():
+    bucket = TokenBucket(rate=10, burst=2)
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == pytest.approx(0.1, abs=0.01)
+    assert bucket.reserve() == pytest.approx(0.2, abs=0.01)
+
+
+def test_bucket_defaults_burst_to_one_second():
+    bucket = TokenBucket(rate=5)
+    assert [bucket.reserve() for _ in range(5)] == [0.0] * 5
+    assert bucket.reserve() > 0
+
+
+def test_bucket_refills_over_time():
+    bucket = TokenBucket(rate=100, burst=1)
+    bucket.reserve()
+    time.sleep(0.02)
+    assert bucket.reserve() == 0.0
+
+
+def test_bucket_caps_reservations_to_max_wait():
+    bucket = TokenBucket(rate=10, burst=1, max_wait_sec=0.5)
+    delays = [bucket.reserve() for _ in range(7)]
+    assert delays[:6] == pytest.approx([0.0, 0.1, 0.2, 0.3, 0.4, 0.5], abs=0.01)
+    assert delays[6] is None
+    assert bucket.reserve_delay() == pytest.approx(0.1, abs=0.01)
+
+
+def test_bucket_refund():
+    bucket = TokenBucket(rate=10, burst=1)
+    bucket.reserve()
+    bucket.reserve()
+    bucket.refund()
+    assert bucket.reserve() == pytest.approx(0.1, abs=0.01)
+
+
+def test_bucket_acquire_waits():
+    async def main():
+        bucket = TokenBucket(rate=50, burst=1)
+        started = time.perf_counter()
+        for _ in range(4):
+            await bucket.acquire()
+        return time.perf_counter() - started
+
+    assert asyncio.run(main()) == pytest.approx(0.06, abs=0.04)
+
+
+def test_bucket_refunds_cancelled_waiters():
+    async def main():
+        bucket = TokenBucket(rate=10, burst=1)
+        await bucket.acquire()
+        await _cancel_waiters(bucket.acquire, 100)
+        return bucket.reserve()
+
+    assert asyncio.run(main()) < 0.2
+
+
+def test_adaptive_bucket_decreases_on_latency_and_recovers():
+    bucket = AdaptiveTokenBucket(
+        rate=100,
+        min_rate=10,
+        target_latency_sec=0.1,
+        adjust_interval_sec=0,
+        decrease_factor=0.5,
+        increase_ratio=0.1,
+    )
+    for _ in range(10):
+        bucket.observe(1.0)
+    assert bucket.rate == 10
+
+    for _ in range(200):
+        bucket.observe(0.0)
+    assert bucket.rate == 100
+
+
+def test_adaptive_bucket_decreases_on_throttle():
+    bucket = AdaptiveTokenBucket(rate=100, adjust_interval_sec=0, decrease_factor=0.5)
+    bucket.observe(0.0, throttled=True)
+    assert bucket.rate == 50
+
+
+def test_adaptive_bucket_adjusts_once_per_interval():
+    bucket = AdaptiveTokenBucket(rate=100, adjust_interval_sec=60, decrease_factor=0.5)
+    for _ in range(10):
+        bucket.observe(1.0, throttled=True)
+    assert bucket.rate == 100
+
+
+def test_limiter_applies_routing_key_and_broker_limits():
+    limiter = PublishLimiter(
+        RateLimitSettings(messages_per_sec=1000, routing_key_messages_per_sec=10, routing_keys={"fast": 500}, burst=1)
+    )
+
+    async def main():
+        started = time.perf_counter()
+        await limiter.acquire("slow")
+        await limiter.acquire("slow")
+        slow = time.perf_counter() - started
+
+        started = time.perf_counter()
+        await limiter.acquire("fast")
+        await limiter.acquire("fast")
+        return slow, time.perf_counter() - started
+
+    slow, fast = asyncio.run(main())
+    assert slow == pytest.approx(0.1, abs=0.04)
+    assert fast < 0.05
+
+
+def test_limiter_refunds_cancelled_waiters():
+    limiter = PublishLimiter(RateLimitSettings(messages_per_sec=10, routing_key_messages_per_sec=10, burst=1))
+
+    async def main():
+        await limiter.acquire("key")
+        await _cancel_waiters(lambda: limiter.acquire("key"), 100)
+        started = time.perf_counter()
+        await limiter.acquire("key")
+        return time.perf_counter() - started
+
+    assert asyncio.run(main()) < 0.2
+
+
+def test_limiter_waits_for_buckets_beyond_max_wait():
+    limiter = PublishLimiter(RateLimitSettings(messages_per_sec=20, burst=1, max_wait_ms=50))
+
+    async def main():
+        started = time.perf_counter()
+        await asyncio.gather(*(limiter.acquire("key") for _ in range(4)))
+        return time.perf_counter() - started
+
+    assert asyncio.run(main()) == pytest.approx(0.15, abs=0.06)
+
+
+def test_limiter_without_limits():
+    limiter = PublishLimiter(RateLimitSettings())
+
+    async def main():
+        started = time.perf_counter()
+        for _ in range(1000):
+            await limiter.acquire("key")
+        return time.perf_counter() - started
+
+    assert asyncio.run(main()) < 0.1
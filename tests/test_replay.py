@@ -0,0 +1,150 @@
+import asyncio
+import time
+from typing import ClassVar
+
+import pytest
+from pydantic import BaseModel
+
+from nfa.broker import Broker
+from nfa.broker.capture import CaptureRecord, CaptureWriter
+from nfa.broker.enums import CaptureDirection
+from nfa.broker.replay import replay
+
+
+class Order(BaseModel):
+    routing_key: ClassVar[str] = "orders"
+    id: int
+
+
+class FakeBroker(Broker):
+    """Broker recording its publishes"""
+
+    def __init__(self, delay: float = 0.0, fail_ids: tuple[int, ...] = ()):
+        super().__init__(None)
+        self.delay = delay
+        self.fail_ids = fail_ids
+        self.published: list[tuple[float, Order]] = []
+        self.in_flight = 0
+
+    async def open(self, warmup=None):
+        pass
+
+    async def close(self):
+        pass
+
+    async def subscribe(self, subscriber, message_type, timeout_sec=None, validation=None, retry=None):
+        pass
+
+    async def publish(self, message):
+        self.in_flight += 1
+        try:
+            await asyncio.sleep(self.delay)
+            if message.id in self.fail_ids:
+                raise ConnectionError("unreachable")
+            self.published.append((time.perf_counter(), message))
+        finally:
+            self.in_flight -= 1
+
+    async def _start(self):
+        pass
+
+
+def _capture(path, *records: CaptureRecord, truncated: bool = False):
+    with CaptureWriter(path) as writer:
+        for record in records:
+            writer.write(record)
+    if truncated:
+        with open(path, "ab") as file:
+            file.write(b"\x00\x00\x01\x00partial")
+    return path
+
+
+def _order(timestamp: float, id: int, direction=CaptureDirection.published) -> CaptureRecord:
+    return CaptureRecord(timestamp, direction, "orders", {}, f'{{"id":{id}}}'.encode())
+
+
+def test_replay_paces_at_the_captured_rate(tmp_path):
+    path = _capture(tmp_path / "traffic.cap", _order(100.0, 1), _order(100.2, 2), _order(100.4, 3))
+    broker = FakeBroker()
+
+    report = asyncio.run(replay(path, broker, [Order], speed=2.0))
+
+    assert report.messages == 3
+    assert [message.id for _, message in broker.published] == [1, 2, 3]
+    assert broker.published[2][0] - broker.published[0][0] == pytest.approx(0.2, abs=0.05)
+    assert report.throughput_per_sec > 0
+
+
+def test_replay_as_fast_as_possible(tmp_path):
+    path = _capture(tmp_path / "traffic.cap", _order(100.0, 1), _order(200.0, 2))
+    report = asyncio.run(replay(path, FakeBroker(), [Order], speed=None))
+    assert report.messages == 2
+    assert report.duration_sec < 1
+
+
+def test_replay_filters_direction_and_unknown_routing_keys(tmp_path):
+    path = _capture(
+        tmp_path / "traffic.cap",
+        _order(100.0, 1),
+        _order(100.0, 2, CaptureDirection.consumed),
+        CaptureRecord(100.0, CaptureDirection.published, "payments", {}, b"{}"),
+    )
+    broker = FakeBroker()
+
+    report = asyncio.run(replay(path, broker, [Order], speed=None))
+    assert (report.messages, report.skipped, report.failed) == (1, 2, 0)
+
+    report = asyncio.run(replay(path, broker, [Order], speed=None, direction=CaptureDirection.consumed))
+    assert [message.id for _, message in broker.published] == [1, 2]
+
+
+def test_replay_counts_failures(tmp_path):
+    path = _capture(
+        tmp_path / "traffic.cap",
+        _order(100.0, 1),
+        CaptureRecord(100.0, CaptureDirection.published, "orders", {}, b'{"id":"not an id"}'),
+        _order(100.0, 3),
+    )
+    broker = FakeBroker(fail_ids=(3,))
+
+    report = asyncio.run(replay(path, broker, [Order], speed=None))
+
+    assert (report.messages, report.skipped, report.failed) == (1, 0, 2)
+    assert [message.id for _, message in broker.published] == [1]
+
+
+def test_replay_bounds_publishes_in_flight(tmp_path):
+    path = _capture(tmp_path / "traffic.cap", *(_order(100.0, id) for id in range(10)))
+    broker = FakeBroker(delay=0.01)
+    peak = 0
+
+    async def run():
+        nonlocal peak
+        task = asyncio.create_task(replay(path, broker, [Order], speed=None, concurrency=3))
+        while not task.done():
+            peak = max(peak, broker.in_flight)
+            await asyncio.sleep(0)
+        return await task
+
+    assert asyncio.run(run()).messages == 10
+    assert peak == 3
+
+
+def test_replay_cancels_publishes_of_a_truncated_capture(tmp_path):
+    path = _capture(tmp_path / "traffic.cap", _order(100.0, 1), truncated=True)
+    broker = FakeBroker(delay=10)
+
+    async def run():
+        with pytest.raises(ValueError, match="Truncated"):
+            await replay(path, broker, [Order], speed=None)
+        assert broker.in_flight == 0
+
+    asyncio.run(run())
+
+
+def test_replay_validates_arguments(tmp_path):
+    path = _capture(tmp_path / "traffic.cap")
+    with pytest.raises(ValueError):
+        asyncio.run(replay(path, FakeBroker(), [Order], speed=0))
+    with pytest.raises(ValueError):
+        asyncio.run(replay(path, FakeBroker(), [Order], concurrency=0))
@@ -0,0 +1,41 @@
+import pytest
+from pydantic import ValidationError
+
+from nfa.broker.retry import RetryPolicy, dead_letter_routing_key, retry_routing_key
+
+
+def test_delay_ms_backs_off_exponentially():
+    policy = RetryPolicy(max_attempts=5, backoff_ms=100, backoff_multiplier=2.0, max_backoff_ms=10000)
+    assert [policy.delay_ms(attempt) for attempt in range(1, 5)] == [100, 200, 400, 800]
+
+
+def test_delay_ms_is_capped():
+    policy = RetryPolicy(max_attempts=10, backoff_ms=1000, backoff_multiplier=3.0, max_backoff_ms=5000)
+    assert policy.delay_ms(1) == 1000
+    assert policy.delay_ms(2) == 3000
+    assert policy.delay_ms(3) == 5000
+    assert policy.delay_ms(9) == 5000
+
+
+def test_delay_ms_constant_backoff():
+    policy = RetryPolicy(backoff_ms=250, backoff_multiplier=1.0)
+    assert policy.delay_ms(1) == policy.delay_ms(2) == 250
+
+
+def test_retries():
+    assert RetryPolicy(max_attempts=1).retries == 0
+    assert RetryPolicy(max_attempts=4).retries == 3
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [{"max_attempts": 0}, {"backoff_ms": 0}, {"max_backoff_ms": -1}, {"backoff_multiplier": 0.5}],
+)
+def test_invalid_policies(kwargs):
+    with pytest.raises(ValidationError):
+        RetryPolicy(**kwargs)
+
+
+def test_routing_keys():
+    assert retry_routing_key("orders", 2) == "orders.retry.2"
+    assert dead_letter_routing_key("orders") == "orders.dlq"
@@ -0,0 +1,85 @@
+import pytest
+from pydantic import BaseModel, Field, ValidationError
+
+from nfa.broker.enums import ValidationMode
+from nfa.broker.validation import LazyMessage, build_message, resolve_validation_mode
+
+
+class Order(BaseModel):
+    id: int
+    quantity: int = Field(gt=0)
+    note: str = "none"
+    sku: str = Field(alias="SKU")
+
+
+@pytest.mark.parametrize(
+    ("subscription_mode", "header", "expected"),
+    [
+        (ValidationMode.full, "trusted", ValidationMode.full),
+        (ValidationMode.trusted, None, ValidationMode.full),
+        (ValidationMode.trusted, "full", ValidationMode.full),
+        (ValidationMode.trusted, "unknown", ValidationMode.full),
+        (ValidationMode.trusted, "trusted", ValidationMode.trusted),
+        (ValidationMode.trusted, "lazy", ValidationMode.trusted),
+        (ValidationMode.lazy, "trusted", ValidationMode.lazy),
+    ],
+)
+def test_resolve_validation_mode(subscription_mode, header, expected):
+    assert resolve_validation_mode(subscription_mode, header) is expected
+
+
+def test_build_message_full_validates():
+    message = build_message(Order, {"id": "1", "quantity": 2, "SKU": "a"}, ValidationMode.full)
+    assert message == Order(id=1, quantity=2, SKU="a")
+
+    with pytest.raises(ValidationError):
+        build_message(Order, {"id": 1, "quantity": 0, "SKU": "a"}, ValidationMode.full)
+
+
+def test_build_message_validates_json_payloads_whatever_the_mode():
+    with pytest.raises(ValidationError):
+        build_message(Order, b'{"id": 1, "quantity": 0, "SKU": "a"}', ValidationMode.trusted)
+
+
+def test_build_message_trusted_skips_validation():
+    message = build_message(Order, {"id": "1", "quantity": 0, "SKU": "a"}, ValidationMode.trusted)
+    assert isinstance(message, Order)
+    assert message.id == "1"
+    assert message.quantity == 0
+
+
+def test_build_message_lazy_returns_proxy():
+    message = build_message(Order, {"id": "1", "quantity": 2, "SKU": "a"}, ValidationMode.lazy)
+    assert isinstance(message, LazyMessage)
+    assert message.model_type is Order
+
+
+def test_lazy_message_validates_accessed_fields_only():
+    message = LazyMessage(Order, {"id": "1", "quantity": 0, "SKU": "a"})
+    assert message.id == 1
+    assert message.sku == "a"
+    assert message.note == "none"
+
+    with pytest.raises(ValidationError):
+        message.quantity
+
+
+def test_lazy_message_caches_validated_fields():
+    data = {"id": "1", "quantity": 2, "SKU": "a"}
+    message = LazyMessage(Order, data)
+    assert message.id == 1
+    data["id"] = "2"
+    assert message.id == 1
+
+
+def test_lazy_message_errors():
+    message = LazyMessage(Order, {"id": 1})
+    with pytest.raises(AttributeError):
+        message.unknown
+    with pytest.raises(ValueError, match="missing"):
+        message.sku
+
+
+def test_lazy_message_model():
+    message = LazyMessage(Order, {"id": "1", "quantity": 2, "SKU": "a"})
+    assert message.model() == Order(id=1, quantity=2, SKU="a")